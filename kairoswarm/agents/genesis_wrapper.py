@@ -1,16 +1,26 @@
 # kairoswarm/agents/genesis_wrapper.py
 
+import asyncio
+from collections import deque
+
 import openai
 import numpy as np
 
+from kairoswarm.agents.template_index import TemplateIndex
+
 class GenesisAgentWrapper:
     def __init__(self, assistant_id, memory=None):
         self.assistant_id = assistant_id
         self.memory = memory or []
+        self.instructions = None  # Last instructions this wrapper set
     
     def add_experience(self, message):
         """Store incoming experience."""
         self.memory.append(message)
+
+    def memory_text(self):
+        """The last 10 experiences, as embedded for identity evaluation."""
+        return " ".join(self.memory[-10:])
         
     def modify_instructions(self, new_instructions):
         """Self-modify the assistant's system instructions."""
@@ -18,6 +28,7 @@ class GenesisAgentWrapper:
             assistant_id=self.assistant_id,
             instructions=new_instructions
         )
+        self.instructions = new_instructions
         print(f"🔄 Updated instructions for Assistant {self.assistant_id}.")
         return response
 
@@ -40,23 +51,21 @@ class GenesisAgentWrapper:
         Analyze memory and determine if a different role matches better.
         
         Args:
-            cultural_templates (list): List of role templates with instructions.
+            cultural_templates (list | TemplateIndex): Role templates with instructions,
+                or a TemplateIndex built from them (reuse one across agents).
             embedding_model (object): Embedding generator (e.g., OpenAI or local).
         """
-        combined_memory = " ".join(self.memory[-10:])  # Last 10 experiences
-        memory_embedding = embedding_model.encode(combined_memory)
-        
-        scores = []
-        for template in cultural_templates:
-            template_embedding = embedding_model.encode(template["instructions"])
-            score = self.cosine_similarity(memory_embedding, template_embedding)
-            scores.append((template["name"], score, template["instructions"]))
+        if not isinstance(cultural_templates, TemplateIndex):
+            # Template embeddings are cached by content, so only the memory is embedded here
+            cultural_templates = TemplateIndex(cultural_templates, embedding_model)
+
+        memory_embedding = embedding_model.encode(self.memory_text())
         
-        best_match = max(scores, key=lambda x: x[1])
+        template, score = cultural_templates.best_match(memory_embedding)
         
-        if best_match[1] > 0.8:  # Threshold for role change
-            print(f"🔍 Identity shift recommended: {best_match[0]} (score {best_match[1]:.2f})")
-            self.modify_instructions(best_match[2])
+        if score > 0.8:  # Threshold for role change
+            print(f"🔍 Identity shift recommended: {template['name']} (score {score:.2f})")
+            self.modify_instructions(template["instructions"])
         else:
             print("🧠 Current role remains best fit.")
 
@@ -64,3 +73,97 @@ class GenesisAgentWrapper:
     def cosine_similarity(vec1, vec2):
         """Compute cosine similarity between two vectors."""
         return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+
+
+class AsyncGenesisAgentWrapper:
+    """
+    Non-blocking counterpart of GenesisAgentWrapper for running many agents on one
+    event loop. Not a subclass: its methods are coroutines, so it can't stand in where
+    a GenesisAgentWrapper is expected (e.g. evaluate_swarm_identity_shifts).
+
+    Uses an AsyncOpenAI client (pass one to share its connection pool across wrappers),
+    keeps one thread per wrapper for all brainstorms, and waits for each run on its
+    event stream instead of returning it unfinished. Experiences live in a deque of at
+    most `max_experiences`, so long-lived agents don't grow without bound.
+    """
+
+    def __init__(self, assistant_id, client=None, memory=None, max_experiences=100):
+        self.assistant_id = assistant_id
+        self.memory = deque(memory or [], maxlen=max_experiences)
+        self.instructions = None  # Last instructions this wrapper set
+        self._client = client
+        self.thread_id = None
+        # One active run per thread: brainstorms on the same wrapper take turns
+        self._thread_lock = asyncio.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = openai.AsyncOpenAI()
+        return self._client
+
+    def add_experience(self, message):
+        """Store incoming experience, dropping the oldest beyond max_experiences."""
+        self.memory.append(message)
+
+    def memory_text(self):
+        """The last 10 experiences, as embedded for identity evaluation."""
+        return " ".join(list(self.memory)[-10:])
+
+    async def modify_instructions(self, new_instructions):
+        """Self-modify the assistant's system instructions."""
+        response = await self.client.beta.assistants.update(
+            assistant_id=self.assistant_id,
+            instructions=new_instructions
+        )
+        self.instructions = new_instructions
+        print(f"🔄 Updated instructions for Assistant {self.assistant_id}.")
+        return response
+
+    async def get_brainstorm(self, prompt):
+        """Runs the assistant on `prompt` in this wrapper's thread and returns its reply text."""
+        async with self._thread_lock:
+            if self.thread_id is None:
+                self.thread_id = (await self.client.beta.threads.create()).id
+            await self.client.beta.threads.messages.create(
+                thread_id=self.thread_id,
+                role="user",
+                content=prompt
+            )
+            async with self.client.beta.threads.runs.stream(
+                thread_id=self.thread_id,
+                assistant_id=self.assistant_id
+            ) as stream:
+                await stream.until_done()
+                messages = await stream.get_final_messages()
+
+        return "".join(
+            part.text.value
+            for message in messages if message.role == "assistant"
+            for part in message.content if part.type == "text"
+        ).strip()
+
+    async def evaluate_identity_shift(self, cultural_templates, embedding_model):
+        """Async evaluate_identity_shift: the (blocking) embedding call runs in a worker thread."""
+        if not isinstance(cultural_templates, TemplateIndex):
+            cultural_templates = await asyncio.to_thread(TemplateIndex, cultural_templates, embedding_model)
+
+        memory_embedding = await asyncio.to_thread(embedding_model.encode, self.memory_text())
+        template, score = cultural_templates.best_match(memory_embedding)
+
+        if score > 0.8:  # Threshold for role change
+            print(f"🔍 Identity shift recommended: {template['name']} (score {score:.2f})")
+            await self.modify_instructions(template["instructions"])
+        else:
+            print("🧠 Current role remains best fit.")
+
+
+async def brainstorm_all(wrappers, prompt, concurrency=16):
+    """Brainstorms `prompt` on many AsyncGenesisAgentWrappers at once. Returns replies in order."""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(wrapper):
+        async with limit:
+            return await wrapper.get_brainstorm(prompt)
+
+    return await asyncio.gather(*(run(w) for w in wrappers))
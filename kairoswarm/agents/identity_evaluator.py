@@ -0,0 +1,99 @@
+# kairoswarm/agents/identity_evaluator.py
+
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from kairoswarm.agents.template_index import TemplateIndex, encode_texts
+
+EMBED_BATCH_SIZE = 256       # Texts per embedding request
+UPDATE_CONCURRENCY = 4       # assistants.update calls in flight
+UPDATES_PER_SECOND = 5.0     # Across all threads
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def evaluate_swarm_identity_shifts(
+    wrappers, cultural_templates, embedding_model, threshold=0.8,
+    max_workers=UPDATE_CONCURRENCY, updates_per_second=UPDATES_PER_SECOND,
+):
+    """
+    Identity evaluation for a whole swarm of GenesisAgentWrappers in one pass.
+
+    Every agent's recent memory is embedded in batched requests, scored against all
+    templates as one (agents, templates) similarity matrix, and agents whose best
+    template clears `threshold` get their instructions updated concurrently, rate
+    limited. Agents without memory, or already running the chosen instructions, are
+    left alone.
+
+    Returns one dict per evaluated agent: assistant_id, template, score, and
+    updated (True / False) or error.
+    """
+    wrappers = list(wrappers)
+    for wrapper in wrappers:
+        if inspect.iscoroutinefunction(wrapper.modify_instructions):
+            raise TypeError(
+                f"{type(wrapper).__name__} has async methods; await its evaluate_identity_shift instead"
+            )
+
+    if not isinstance(cultural_templates, TemplateIndex):
+        cultural_templates = TemplateIndex(cultural_templates, embedding_model)
+
+    agents = [w for w in wrappers if w.memory]
+    if not agents:
+        return []
+
+    texts = [w.memory_text() for w in agents]
+    embeddings = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        embeddings.extend(encode_texts(embedding_model, texts[start:start + EMBED_BATCH_SIZE]))
+
+    scores = cultural_templates.score_many(np.stack(embeddings))
+    best = scores.argmax(axis=1)
+
+    results, updates = [], []
+    for wrapper, row, index in zip(agents, scores, best):
+        template = cultural_templates.templates[index]
+        result = {"assistant_id": wrapper.assistant_id, "template": template["name"],
+                  "score": float(row[index]), "updated": False}
+        results.append(result)
+        if result["score"] > threshold and wrapper.instructions != template["instructions"]:
+            updates.append((wrapper, template, result))
+
+    limiter = RateLimiter(updates_per_second)
+
+    def apply(update):
+        wrapper, template, result = update
+        limiter.wait()
+        try:
+            wrapper.modify_instructions(template["instructions"])
+            result["updated"] = True
+        except Exception as e:
+            result["error"] = str(e)
+
+    if updates:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(apply, updates))
+
+    shifted = sum(r["updated"] for r in results)
+    print(f"🔍 Evaluated {len(results)} agents against {len(cultural_templates.templates)} templates: "
+          f"{shifted} identity shifts applied.")
+    return results
@@ -0,0 +1,108 @@
+# kairoswarm/agents/template_index.py
+
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "KAIROSWARM_TEMPLATE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "kairoswarm", "template_embeddings.npz"),
+)
+
+# cache path -> {content key: embedding}, loaded from disk once per process
+_loaded_caches = {}
+# Index builds may run in threads (asyncio.to_thread): one updates and saves a cache at a time
+_cache_lock = threading.Lock()
+
+
+def _model_name(embedding_model):
+    return getattr(embedding_model, "model", type(embedding_model).__name__)
+
+
+def content_key(embedding_model, text):
+    """Cache key of an embedding: the model and a hash of the exact text."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{_model_name(embedding_model)}:{digest}"
+
+
+def encode_texts(embedding_model, texts):
+    """Embeds texts in one request when the model offers encode_batch, else one by one."""
+    if hasattr(embedding_model, "encode_batch"):
+        return [np.asarray(e, dtype=np.float32) for e in embedding_model.encode_batch(texts)]
+    return [np.asarray(embedding_model.encode(text), dtype=np.float32) for text in texts]
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _load_cache(path):
+    if path not in _loaded_caches:
+        cache = {}
+        if path and os.path.exists(path):
+            with np.load(path) as data:
+                cache = dict(zip(data["keys"].tolist(), data["embeddings"]))
+        _loaded_caches[path] = cache
+    return _loaded_caches[path]
+
+
+def _save_cache(path, cache):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Every model in the cache must share a dimension to stack; keep the rest in memory only
+    dim = next(iter(cache.values())).shape[0]
+    keys = [k for k, v in cache.items() if v.shape[0] == dim]
+    # A temp file of its own, so concurrent index builds never write or replace each other's
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp.npz")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, keys=np.array(keys), embeddings=np.stack([cache[k] for k in keys]))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class TemplateIndex:
+    """
+    Cultural templates embedded once and held as a normalized (templates, dim) matrix.
+
+    Embeddings are cached by model and instruction text, in memory and in an .npz file
+    (cache_path=None keeps them in memory only), so a template is only re-embedded when
+    its instructions change. Scoring a memory embedding against every template is one
+    matrix-vector product; score_many scores a whole batch of agents at once.
+    """
+
+    def __init__(self, templates, embedding_model, cache_path=DEFAULT_CACHE_PATH):
+        self.templates = list(templates)
+        cache = _load_cache(cache_path)
+
+        keys = [content_key(embedding_model, t["instructions"]) for t in self.templates]
+        missing = [(key, t["instructions"]) for key, t in zip(keys, self.templates) if key not in cache]
+        if missing:
+            missing = list(dict(missing).items())  # same instructions in several templates: embed once
+            embeddings = encode_texts(embedding_model, [text for _, text in missing])
+            with _cache_lock:
+                cache.update((key, embedding) for (key, _), embedding in zip(missing, embeddings))
+                if cache_path:
+                    _save_cache(cache_path, cache)
+
+        self.matrix = normalize_rows(np.stack([cache[key] for key in keys])) if keys else None
+
+    def scores(self, embedding):
+        """Cosine similarity of one embedding to every template, in template order."""
+        return self.matrix @ normalize_rows(np.asarray(embedding, dtype=np.float32))
+
+    def score_many(self, embeddings):
+        """(embeddings, templates) cosine similarity matrix for a batch of embeddings."""
+        return normalize_rows(np.asarray(embeddings, dtype=np.float32)) @ self.matrix.T
+
+    def best_match(self, embedding):
+        """(template, score) of the most similar template."""
+        scores = self.scores(embedding)
+        best = int(np.argmax(scores))
+        return self.templates[best], float(scores[best])
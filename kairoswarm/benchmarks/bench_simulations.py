@@ -0,0 +1,155 @@
+# kairoswarm/benchmarks/bench_simulations.py
+#
+# Offline performance baseline for the simulation core.
+# Usage: python -m kairoswarm.benchmarks.bench_simulations [--quick] [--no-save] [--fail-on-regression]
+#        [--results-dir DIR]   (default $KAIROSWARM_BENCH_RESULTS, else ./bench_results)
+
+import argparse
+import contextlib
+import io
+import os
+import random
+
+import numpy as np
+
+from kairoswarm.agents.genesis_teacher_agent import GenesisTeacherAgent
+from kairoswarm.benchmarks.harness import RESULTS_DIR, compare, latest_results, report, save_results, timeit
+from kairoswarm.environment.agent_node import AgentNode
+from kairoswarm.environment.semantic_vector import SemanticVector
+from kairoswarm.environment.swarm_graph import SwarmGraph
+from kairoswarm.simulations import swarm_behavior_sim
+
+SUITE = "simulations"
+
+# (agents, follows per agent)
+GRAPH_CASES = [(10, 3), (100, 3), (100, 20), (1000, 3), (1000, 20)]
+VECTOR_DIMS = [128, 1536]
+GENERATIONS = [1, 3, 5]
+FIELD_CASES = [(50, 100), (200, 100)]  # (agents, steps)
+
+
+def seed(value=42):
+    random.seed(value)
+    np.random.seed(value)
+
+
+def build_swarm(size, follows):
+    """A swarm where every agent starts with a message in its inbox, so step() does full work."""
+    swarm = SwarmGraph()
+    names = [f"Agent_{i:04d}" for i in range(size)]
+    for name in names:
+        swarm.add_agent(AgentNode(name))
+
+    for name in names:
+        others = random.sample(names, k=min(follows + 1, size))
+        for target in [n for n in others if n != name][:follows]:
+            swarm.connect(name, target)
+
+    for agent in swarm.agents.values():
+        agent.receive(agent.post("seed"))
+    return swarm
+
+
+def bench_swarm_step(results, repeat):
+    for size, follows in GRAPH_CASES:
+        seed()
+        results[f"swarm_graph.step[n={size},k={follows}]"] = timeit(
+            lambda swarm: swarm.step(),
+            setup=lambda: build_swarm(size, follows),
+            repeat=repeat,
+        )
+
+
+def bench_semantic_vector(results, repeat):
+    for dim in VECTOR_DIMS:
+        seed()
+        results[f"semantic_vector.create[dim={dim}]"] = timeit(
+            lambda: SemanticVector(dim=dim), number=200, repeat=repeat
+        )
+        vec = SemanticVector(dim=dim)
+        results[f"semantic_vector.get_normal_energy[dim={dim}]"] = timeit(
+            lambda: vec.get_normal_energy([0, 1, 2]), number=200, repeat=repeat
+        )
+
+
+def grow_lineage(generations):
+    """Returns an agent `generations` deep with a full experience buffer."""
+    agent = GenesisTeacherAgent(name="Kai_Teacher", curiosity=0.05)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(generations):
+            feed(agent)
+            agent = agent.create_child()
+        feed(agent)
+    return agent
+
+
+def feed(agent):
+    for i in range(agent.memory_limit):
+        agent.receive({"vector": SemanticVector(dominant_dims=agent.dominant_dims, noise_scale=0.02 * i)})
+    agent.act()
+
+
+def bench_create_child(results, repeat):
+    for generations in GENERATIONS:
+        seed()
+        agent = grow_lineage(generations)
+
+        def create_child():
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent.create_child()
+
+        results[f"genesis_teacher.create_child[gen={generations}]"] = timeit(
+            create_child, number=50, repeat=repeat
+        )
+
+
+def bench_gradient_field(results, repeat):
+    for num_agents, steps in FIELD_CASES:
+        seed()
+        results[f"gradient_field.run_simulation[agents={num_agents},steps={steps}]"] = timeit(
+            lambda: swarm_behavior_sim.run_simulation(num_agents=num_agents, steps=steps),
+            repeat=max(1, repeat // 2),
+        )
+    results["gradient_field.generate[100x100]"] = timeit(
+        lambda: swarm_behavior_sim.generate_gradient_field((100, 100)), number=50, repeat=repeat
+    )
+
+
+def run(quick=False):
+    repeat = 3 if quick else 7
+    results = {}
+    bench_swarm_step(results, repeat)
+    bench_semantic_vector(results, repeat)
+    bench_create_child(results, repeat)
+    bench_gradient_field(results, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kairoswarm simulation benchmarks")
+    parser.add_argument("--quick", action="store_true", help="fewer samples per benchmark")
+    parser.add_argument("--no-save", action="store_true", help="don't write a results JSON")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="where results JSON is written and compared")
+    parser.add_argument("--threshold", type=float, default=0.10, help="median slowdown counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    print("⏱️  Running simulation benchmarks...")
+    results = run(quick=args.quick)
+    report(results)
+
+    saved = None
+    if not args.no_save:
+        saved = save_results(SUITE, results, results_dir=args.results_dir)
+        print(f"\n💾 Saved {saved}")
+
+    previous = latest_results(SUITE, exclude=os.path.basename(saved) if saved else None,
+                              results_dir=args.results_dir)
+    if previous:
+        regressions = compare(results, previous, threshold=args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(f"{len(regressions)} benchmark(s) regressed")
+
+
+if __name__ == "__main__":
+    main()
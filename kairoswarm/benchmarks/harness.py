@@ -0,0 +1,105 @@
+# kairoswarm/benchmarks/harness.py
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+# Outside the package so results don't end up in the source tree (gitignored at the repo root)
+RESULTS_DIR = os.getenv("KAIROSWARM_BENCH_RESULTS", os.path.join(os.getcwd(), "bench_results"))
+
+
+def timeit(fn, repeat=5, number=1, setup=None):
+    """
+    Calls fn `number` times per sample, `repeat` samples. If setup is given it runs
+    before every sample (untimed) and its return value is passed to fn.
+    Returns per-call timings in seconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(arg) if setup else fn()
+        samples.append((time.perf_counter() - start) / number)
+    return summarize(samples)
+
+
+def summarize(samples):
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "samples": len(samples),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def save_results(suite, results, results_dir=RESULTS_DIR):
+    """Writes <results_dir>/<suite>-<timestamp>-<rev>.json and returns the path."""
+    os.makedirs(results_dir, exist_ok=True)
+    rev = git_revision()
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    payload = {
+        "suite": suite,
+        "revision": rev,
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    path = os.path.join(results_dir, f"{suite}-{stamp}-{rev}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    return path
+
+
+def latest_results(suite, exclude=None, results_dir=RESULTS_DIR):
+    if not os.path.isdir(results_dir):
+        return None
+    runs = sorted(
+        f for f in os.listdir(results_dir)
+        if f.startswith(f"{suite}-") and f.endswith(".json") and f != exclude
+    )
+    if not runs:
+        return None
+    with open(os.path.join(results_dir, runs[-1])) as f:
+        return json.load(f)
+
+
+def compare(current, previous, threshold=0.10):
+    """
+    Prints median deltas against a previous run. Returns the names of benchmarks
+    that got slower by more than `threshold`.
+    """
+    regressions = []
+    print(f"\nComparing against {previous['revision']} ({previous['created_at']}):")
+    for name, stats in sorted(current.items()):
+        before = previous["results"].get(name)
+        if not before:
+            print(f"  {name:<55} new")
+            continue
+        delta = (stats["median"] - before["median"]) / before["median"]
+        flag = ""
+        if delta > threshold:
+            flag = "  ⚠️ regression"
+            regressions.append(name)
+        print(f"  {name:<55} {delta:+7.1%}{flag}")
+    return regressions
+
+
+def report(results):
+    for name, stats in sorted(results.items()):
+        print(f"  {name:<55} median {stats['median'] * 1e3:10.3f} ms   min {stats['min'] * 1e3:10.3f} ms")
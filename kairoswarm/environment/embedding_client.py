@@ -13,3 +13,11 @@ class EmbeddingClient:
             model=self.model
         )
         return response.data[0].embedding
+
+    def encode_batch(self, texts):
+        """Generate embeddings for many texts in a single request, in input order."""
+        response = openai.embeddings.create(
+            input=list(texts),
+            model=self.model
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
@@ -0,0 +1,205 @@
+# kairoswarm/simulations/recorder.py
+
+import json
+import os
+import struct
+
+import numpy as np
+
+META_FILE = "meta.json"
+POSITIONS_FILE = "positions.bin"
+EVENTS_FILE = "events.log"
+EVENTS_INDEX_FILE = "events.idx"
+
+# Event log frame: payload length, tick, kind code — followed by a UTF-8 JSON payload
+FRAME_HEADER = struct.Struct("<IIB")
+EVENT_KINDS = {"message": 0, "spawn": 1}
+EVENT_NAMES = {code: kind for kind, code in EVENT_KINDS.items()}
+
+# Index entry per event: tick, byte offset of its frame in the log
+INDEX_DTYPE = np.dtype([("tick", "<u4"), ("offset", "<u8")])
+
+
+def _to_jsonable(value):
+    """Fallback encoder for things simulations put in messages (vectors, numpy scalars)."""
+    if hasattr(value, "vector"):  # SemanticVector
+        return value.vector.tolist()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, set):
+        return sorted(value)
+    return str(value)
+
+
+class TrajectoryRecorder:
+    """
+    Streams per-tick simulation state to disk instead of keeping it in Python lists.
+
+    Positions are appended as raw float64 frames that can be memory-mapped back,
+    messages and spawned agents go to an append-only framed log with a tick index.
+    A run_dir holds one run: recording into it replaces whatever was there before.
+    """
+
+    def __init__(self, run_dir, flush_every=64):
+        self.run_dir = run_dir
+        self.flush_every = flush_every
+        os.makedirs(run_dir, exist_ok=True)
+
+        self.position_shape = None
+        self.ticks = 0
+        self.event_count = 0
+        self._last_event_tick = 0
+        self._pending_index = []
+
+        self._positions = open(os.path.join(run_dir, POSITIONS_FILE), "wb")
+        self._events = open(os.path.join(run_dir, EVENTS_FILE), "wb")
+        self._index = open(os.path.join(run_dir, EVENTS_INDEX_FILE), "wb")
+        self._write_meta()  # so a stale meta.json never describes the truncated files
+
+    def record_positions(self, tick, positions):
+        """Append one (num_agents, dims) frame of positions for this tick."""
+        frame = np.ascontiguousarray(positions, dtype=np.float64)
+        if self.position_shape is None:
+            self.position_shape = frame.shape
+        elif frame.shape != self.position_shape:
+            raise ValueError(f"Position frame shape {frame.shape} != {self.position_shape}")
+
+        self._positions.write(frame.tobytes())
+        self.ticks = max(self.ticks, tick + 1)
+
+    def record_messages(self, tick, messages):
+        for msg in messages:
+            self._write_event(tick, "message", msg)
+        self.ticks = max(self.ticks, tick + 1)
+
+    def record_spawn(self, tick, child, parent=None):
+        """Record an agent born during this tick (e.g. from GenesisTeacherAgent.create_child)."""
+        self._write_event(tick, "spawn", {
+            "name": child.name,
+            "parent": parent.name if parent is not None else None,
+            "curiosity": getattr(child, "curiosity", None),
+            "dominant_dims": getattr(child, "dominant_dims", None),
+            "lineage": getattr(child, "lineage", None),
+        })
+        self.ticks = max(self.ticks, tick + 1)
+
+    def _write_event(self, tick, kind, payload):
+        # The tick index is binary-searched on read, so events must arrive in tick order
+        if tick < self._last_event_tick:
+            raise ValueError(f"Event tick {tick} is earlier than last recorded tick {self._last_event_tick}")
+        self._last_event_tick = tick
+
+        data = json.dumps(payload, default=_to_jsonable).encode("utf-8")
+        offset = self._events.tell()
+        self._events.write(FRAME_HEADER.pack(len(data), tick, EVENT_KINDS[kind]))
+        self._events.write(data)
+        self._pending_index.append((tick, offset))
+        self.event_count += 1
+
+        if len(self._pending_index) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._pending_index:
+            self._index.write(np.array(self._pending_index, dtype=INDEX_DTYPE).tobytes())
+            self._pending_index = []
+        for f in (self._positions, self._events, self._index):
+            f.flush()
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "ticks": self.ticks,
+            "position_shape": list(self.position_shape) if self.position_shape else None,
+            "position_dtype": "float64",
+            "event_count": self.event_count,
+        }
+        with open(os.path.join(self.run_dir, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    def close(self):
+        self.flush()
+        for f in (self._positions, self._events, self._index):
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """Lazy view over a recorded run — nothing is loaded until it is indexed or iterated."""
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        with open(os.path.join(run_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+
+    @property
+    def ticks(self):
+        return self.meta["ticks"]
+
+    @property
+    def positions(self):
+        """Memory-mapped array of shape (ticks, num_agents, dims), or None if no positions were recorded."""
+        shape = self.meta["position_shape"]
+        path = os.path.join(self.run_dir, POSITIONS_FILE)
+        if not shape or os.path.getsize(path) == 0:
+            return None
+
+        frame_size = int(np.prod(shape))
+        frames = os.path.getsize(path) // (frame_size * 8)
+        return np.memmap(path, dtype=self.meta["position_dtype"], mode="r", shape=(frames, *shape))
+
+    def trajectory(self, agent_idx):
+        """Path of a single agent across all ticks, shape (ticks, dims), or None if no positions were recorded."""
+        positions = self.positions
+        return None if positions is None else positions[:, agent_idx, :]
+
+    def _index(self):
+        path = os.path.join(self.run_dir, EVENTS_INDEX_FILE)
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        return np.memmap(path, dtype=INDEX_DTYPE, mode="r")
+
+    def iter_events(self, kind=None, start_tick=0, end_tick=None):
+        """
+        Yield (tick, kind, payload) for events in [start_tick, end_tick).
+        Uses the tick index to seek straight to the first matching frame.
+        """
+        index = self._index()
+        if len(index) == 0:
+            return
+
+        first = int(np.searchsorted(index["tick"], start_tick, side="left"))
+        if first >= len(index):
+            return
+
+        with open(os.path.join(self.run_dir, EVENTS_FILE), "rb") as f:
+            f.seek(int(index["offset"][first]))
+            while True:
+                header = f.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                length, tick, code = FRAME_HEADER.unpack(header)
+                if end_tick is not None and tick >= end_tick:
+                    break
+                payload = f.read(length)
+                event_kind = EVENT_NAMES[code]
+                if kind is None or kind == event_kind:
+                    yield tick, event_kind, json.loads(payload)
+
+    def messages(self, start_tick=0, end_tick=None):
+        for tick, _, payload in self.iter_events("message", start_tick, end_tick):
+            yield tick, payload
+
+    def lineages(self):
+        """Rebuild the {agent: ancestors} mapping used by the genesis tree visualizations."""
+        return {
+            payload["name"]: payload.get("lineage") or []
+            for _, _, payload in self.iter_events("spawn")
+        }
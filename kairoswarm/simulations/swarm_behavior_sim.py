@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 # Parameters
 NUM_AGENTS = 50
@@ -15,10 +14,11 @@ def generate_gradient_field(shape):
 
 # Agent definition
 class Agent:
-    def __init__(self, idx, x, y):
+    def __init__(self, idx, x, y, track_path=True):
         self.id = idx
         self.pos = np.array([x, y], dtype=float)
-        self.path = [self.pos.copy()]
+        # With a recorder attached the trajectory lives on disk, not in this list
+        self.path = [self.pos.copy()] if track_path else None
 
     def sense(self, field):
         x, y = int(self.pos[0]), int(self.pos[1])
@@ -35,7 +35,7 @@ class Agent:
 
         for d in directions:
             new_pos = self.pos + d * delta
-            val = Agent(0, *new_pos).sense(field)
+            val = Agent(0, *new_pos, track_path=False).sense(field)
             if val > best_val:
                 best_val = val
                 best_dir = d
@@ -43,24 +43,57 @@ class Agent:
         # Move in direction of increasing gradient (simple chemotaxis)
         self.pos += best_dir
         self.pos = np.clip(self.pos, 0, FIELD_SIZE[0]-1)
-        self.path.append(self.pos.copy())
-
-# Initialize
-field = generate_gradient_field(FIELD_SIZE)
-agents = [Agent(i, np.random.randint(0, FIELD_SIZE[0]), np.random.randint(0, FIELD_SIZE[1])) for i in range(NUM_AGENTS)]
-
-# Simulate
-for step in range(STEPS):
-    for agent in agents:
-        agent.move(field)
-
-# Plot
-plt.figure(figsize=(8, 8))
-plt.imshow(field, cmap='viridis', origin='lower')
-for agent in agents:
-    path = np.array(agent.path)
-    plt.plot(path[:, 0], path[:, 1], alpha=0.6)
-plt.title("Agent Swarm Following Gradient")
-plt.xlabel("X")
-plt.ylabel("Y")
-plt.show()
\ No newline at end of file
+        if self.path is not None:
+            self.path.append(self.pos.copy())
+
+def run_simulation(num_agents=NUM_AGENTS, steps=STEPS, field_size=FIELD_SIZE, recorder=None):
+    """
+    Runs the gradient-following swarm. If a TrajectoryRecorder is given, positions
+    are streamed to it every tick instead of accumulating in each agent's path.
+    """
+    field = generate_gradient_field(field_size)
+    track_path = recorder is None
+    agents = [
+        Agent(i, np.random.randint(0, field_size[0]), np.random.randint(0, field_size[1]), track_path=track_path)
+        for i in range(num_agents)
+    ]
+
+    if recorder:
+        recorder.record_positions(0, np.array([agent.pos for agent in agents]))
+
+    for step in range(steps):
+        for agent in agents:
+            agent.move(field)
+        if recorder:
+            recorder.record_positions(step + 1, np.array([agent.pos for agent in agents]))
+
+    return field, agents
+
+def plot_paths(field, paths):
+    """paths: iterable of (ticks, 2) arrays — agent.path lists or TrajectoryReader.trajectory views."""
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(8, 8))
+    plt.imshow(field, cmap='viridis', origin='lower')
+    for path in paths:
+        path = np.asarray(path)
+        plt.plot(path[:, 0], path[:, 1], alpha=0.6)
+    plt.title("Agent Swarm Following Gradient")
+    plt.xlabel("X")
+    plt.ylabel("Y")
+    plt.show()
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        from kairoswarm.simulations.recorder import TrajectoryRecorder, TrajectoryReader
+
+        run_dir = sys.argv[1]
+        with TrajectoryRecorder(run_dir) as recorder:
+            field, agents = run_simulation(recorder=recorder)
+        reader = TrajectoryReader(run_dir)
+        plot_paths(field, (reader.trajectory(i) for i in range(len(agents))))
+    else:
+        field, agents = run_simulation()
+        plot_paths(field, (agent.path for agent in agents))
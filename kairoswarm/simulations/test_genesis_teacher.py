@@ -3,14 +3,15 @@
 from kairoswarm.agents.genesis_teacher_agent import GenesisTeacherAgent
 from kairoswarm.environment.semantic_vector import SemanticVector
 
-def run_teacher_experiment():
+def run_teacher_experiment(generations=3, recorder=None):
     print("🌱 Launching Teacher Pulse Experiment...")
 
     # Create the first parent agent
     parent = GenesisTeacherAgent(name="Kai_Teacher", curiosity=0.05)
 
     all_agents = [parent]
-    generations = 3  # How many times to create children
+    if recorder:
+        recorder.record_spawn(0, parent)
 
     for gen in range(generations):
         print(f"\n🌀 Generation {gen+1}")
@@ -27,6 +28,8 @@ def run_teacher_experiment():
             child = agent.create_child()
             if child:
                 new_agents.append(child)
+                if recorder:
+                    recorder.record_spawn(gen, child, parent=agent)
 
         all_agents.extend(new_agents)
 
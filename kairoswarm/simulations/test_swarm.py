@@ -34,8 +34,13 @@ def build_test_swarm(size=10):
 
     return swarm
 
-def run_genesis_pulse():
-    print("🚀 Running Genesis Pulse...")
+def run_genesis_pulse(ticks=3, recorder=None, verbose=True):
+    """
+    Runs the pulse for a number of ticks. Pass a TrajectoryRecorder to stream each
+    tick's messages to disk; set verbose=False for long runs that shouldn't print.
+    """
+    if verbose:
+        print("🚀 Running Genesis Pulse...")
 
     swarm = build_test_swarm(size=10)
 
@@ -44,11 +49,17 @@ def run_genesis_pulse():
     message = origin.post("The world has changed. Cooperation is the new game.")
     swarm.broadcast(origin.name, message)
 
-    # Run 3 ticks of the swarm
-    for tick in range(3):
-        print(f"\n🕒 Tick {tick + 1}")
+    if recorder:
+        recorder.record_messages(0, [message])
+
+    for tick in range(ticks):
         messages = swarm.step()
+        if recorder:
+            recorder.record_messages(tick + 1, messages)
 
+        if not verbose:
+            continue
+        print(f"\n🕒 Tick {tick + 1}")
         if not messages:
             print("No new messages.")
         for msg in messages:
@@ -74,6 +74,13 @@ def draw_colored_tree(G):
 
 # Main
 if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        # Load lineages from a run recorded with TrajectoryRecorder
+        from kairoswarm.simulations.recorder import TrajectoryReader
+        lineages = TrajectoryReader(sys.argv[1]).lineages()
+
     G = build_tree(lineages)
     draw_colored_tree(G)
 
@@ -2,8 +2,12 @@ import random
 import asyncio
 
 class BaseAgent:
-    def __init__(self, name):
+    # What the agent cares about; the router scores contexts against its embedding
+    interests = ""
+
+    def __init__(self, name, model=None):
         self.name = name
+        self.model = model
 
     def wants_to_speak(self, context: str) -> float:
         """
@@ -20,8 +24,10 @@ class BaseAgent:
 
 
 class Kai(BaseAgent):
-    def __init__(self):
-        super().__init__("Kai")
+    interests = "strategy systems planning leverage points architecture structure long-term goals"
+
+    def __init__(self, model=None):
+        super().__init__("Kai", model)
 
     def wants_to_speak(self, context: str) -> float:
         if "strategy" in context.lower() or "system" in context.lower():
@@ -34,8 +40,10 @@ class Kai(BaseAgent):
 
 
 class Nova(BaseAgent):
-    def __init__(self):
-        super().__init__("Nova")
+    interests = "emotion reflection feelings empathy meaning resonance relationships values"
+
+    def __init__(self, model=None):
+        super().__init__("Nova", model)
 
     def wants_to_speak(self, context: str) -> float:
         if "emotion" in context.lower() or "reflection" in context.lower():
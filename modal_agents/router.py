@@ -1,25 +1,36 @@
-from modal import App, asgi_app
-import random
+from modal import App, Image, Secret, asgi_app
 import asyncio
+import os
 
 from agents import Kai, Nova
+from urgency import UrgencyRouter
 
 app = App()
 
+# Urgency scoring embeds contexts with OpenAI (see urgency.py)
+image = Image.debian_slim().run_commands("pip install openai numpy")
+
 # Define agent list here
 # Foundation model for agents: gpt-4o-mini (explicitly chosen for balanced reasoning and cost)
 AGENTS = [Kai(model="gpt-4o-mini"), Nova(model="gpt-4o-mini")]
 
-@app.function()
-async def route_turn(context: str) -> str:
+# Speakers per turn, and the urgency below which extra speakers stay quiet
+TOP_K = int(os.getenv("ROUTER_TOP_K", "1"))
+MIN_SCORE = float(os.getenv("ROUTER_MIN_SCORE", "0.3"))
+
+# Module level so interest embeddings are reused across turns on a warm container
+router = UrgencyRouter(AGENTS)
+
+@app.function(image=image, secrets=[Secret.from_name("openai-key")])
+async def route_turn(context: str, k: int = None) -> str:
     """
-    Determines which agent wants to speak most based on their internal urgency.
-    Returns that agent's response.
+    Scores every agent's urgency for the context in one batch and lets the top-k
+    respond concurrently. Returns their responses, most urgent first.
     """
-    scores = [(agent, agent.wants_to_speak(context)) for agent in AGENTS]
-    speaker, score = max(scores, key=lambda x: x[1])
-    response = await speaker.respond(context)
-    return f"{speaker.name}: {response}"
+    # The context embedding is a blocking OpenAI call
+    speakers = await asyncio.to_thread(router.select, context, k or TOP_K, MIN_SCORE)
+    responses = await asyncio.gather(*(agent.respond(context) for agent, _ in speakers))
+    return "\n".join(f"{agent.name}: {response}" for (agent, _), response in zip(speakers, responses))
 
 # Optional: expose as ASGI app if needed for web preview
 @app.asgi()
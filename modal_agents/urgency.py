@@ -0,0 +1,129 @@
+# modal_agents/urgency.py
+#
+# Batched urgency scoring for the turn router.
+#
+# Every agent declares its `interests` as text. Their embeddings are computed once and
+# kept, keyed by agent name and interests text, as rows of a normalized matrix;
+# a turn embeds the context once and scores all agents with a single matrix-vector
+# product (cosine similarity), then picks the top-k. Editing an agent's interests only
+# re-embeds that agent.
+#
+# The encoder is anything with `encode(text) -> vector` (the same interface
+# GenesisAgentWrapper takes; `encode_batch(texts)` is used when present). The default is
+# OpenAIEncoder when OPENAI_API_KEY is set, else HashingEncoder: a local bag of words for
+# offline runs and tests that only matches shared words, and whose hash collisions can
+# mis-route. Agents with empty `interests` are not embedded and score 0.
+#
+# Ties, including "no agent matches at all" (best score <= 0), are broken at random, as
+# the old random urgency did, rather than always favoring the first agent.
+
+import hashlib
+import os
+import random
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+class OpenAIEncoder:
+    """OpenAI embeddings (synchronous client; call from a worker thread in async code)."""
+
+    def __init__(self, model=None):
+        self.model = model or os.getenv("ROUTER_EMBEDDING_MODEL", "text-embedding-3-small")
+
+    def encode(self, text):
+        return self.encode_batch([text])[0]
+
+    def encode_batch(self, texts):
+        import openai
+
+        response = openai.embeddings.create(input=list(texts), model=self.model)
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+class HashingEncoder:
+    """Bag of words hashed into `dim` buckets (stable across processes, unlike hash())."""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def encode(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+
+def default_encoder():
+    return OpenAIEncoder() if os.getenv("OPENAI_API_KEY") else HashingEncoder()
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class UrgencyRouter:
+    def __init__(self, agents, encoder=None, seed=None):
+        self.agents = list(agents)
+        self.encoder = encoder or default_encoder()
+        self._random = random.Random(seed)
+        self._interest_vectors = {}  # (name, interests) -> normalized vector
+        self._matrix = None
+        self._matrix_keys = None
+        self._rows = []  # self.agents index of each matrix row
+
+    def interest_matrix(self):
+        """
+        (agents with interests x dim) matrix of normalized interest embeddings, rebuilt
+        only when interests change. None when no agent has interests.
+        """
+        keys = [(agent.name, agent.interests) for agent in self.agents]
+        if keys != self._matrix_keys:
+            # Embedding APIs reject empty input, and an empty vector would score 0 anyway
+            self._rows = [i for i, (_, interests) in enumerate(keys) if interests and interests.strip()]
+            embedded = [keys[i] for i in self._rows]
+            missing = [key for key in dict.fromkeys(embedded) if key not in self._interest_vectors]
+            if missing:
+                texts = [interests for _, interests in missing]
+                if hasattr(self.encoder, "encode_batch"):
+                    embeddings = self.encoder.encode_batch(texts)
+                else:
+                    embeddings = [self.encoder.encode(text) for text in texts]
+                for key, embedding in zip(missing, embeddings):
+                    self._interest_vectors[key] = _normalize(embedding)
+            # Drop vectors of agents whose interests changed or who left
+            self._interest_vectors = {key: self._interest_vectors[key] for key in embedded}
+            self._matrix = np.stack([self._interest_vectors[key] for key in embedded]) if embedded else None
+            self._matrix_keys = keys
+        return self._matrix
+
+    def scores(self, context):
+        """Urgency of every agent for `context`, in self.agents order."""
+        matrix = self.interest_matrix()
+        scores = np.zeros(len(self.agents), dtype=np.float32)
+        if matrix is not None and context and context.strip():
+            scores[self._rows] = matrix @ _normalize(self.encoder.encode(context))
+        return scores
+
+    def select(self, context, k=1, min_score=None):
+        """
+        The k most urgent agents as (agent, score), best first, ties in random order.
+        Agents scoring below `min_score` are left out, but the best agent is always
+        returned; if nobody scores above 0, that is a random one.
+        """
+        scores = self.scores(context)
+        k = max(1, min(k, len(self.agents)))
+        ranking = scores if scores.max() > 0 else np.zeros_like(scores)
+        # Stable sort over a random permutation: equal scores keep that random order
+        shuffled = np.array(self._random.sample(range(len(scores)), len(scores)))
+        top = shuffled[np.argsort(-ranking[shuffled], kind="stable")][:k]
+        chosen = [(self.agents[i], float(scores[i])) for i in top]
+        if min_score is not None:
+            chosen = chosen[:1] + [(agent, score) for agent, score in chosen[1:] if score >= min_score]
+        return chosen
@@ -0,0 +1,81 @@
+# modal_api/api.py
+#
+# FastAPI application factory. Routers (and the SDKs behind them) are imported when
+# the app is built inside the container, not when app.py is loaded for `modal deploy`.
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from modal_api.utils.metrics import MetricsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(api: FastAPI):
+    from modal_api.utils.services import warm_up, close_clients
+
+    # Runs before the container accepts its first request
+    await warm_up()
+    yield
+    await close_clients()
+
+
+def include_routers(api: FastAPI):
+    from modal_api.routes.runtime import router as runtime_router
+    from modal_api.routes.memory import router as memory_router
+    from modal_api.routes.reload import router as reload_router
+    from modal_api.routes.users import router as users_router
+    from modal_api.routes.auth import router as auth_router
+    from modal_api.routes.autoregister import router as autoregister_router
+    from modal_api.routes.swarms_deprecated import router as swarms_router
+    from modal_api.routes.metrics import router as metrics_router
+    #from kairoswarm_core.routes.swarms import router as swarms_router
+    from kairoswarm_core.routes.persistent_runtime import router as persistent_runtime_router
+    from kairoswarm_core.routes.ephemeral_runtime import router as ephemeral_runtime_router
+    #from kairoswarm_core.routes.conversation_runtime import router as conversation_runtime_router
+    from kairoswarm_core.routes.conversation_ws import router as conversation_runtime_router
+    from kairoswarm_core.routes.payments import router as payments_router
+    from kairoswarm_core.routes.accounts import router as accounts_router
+    from kairoswarm_core.routes.alerts import router as alerts_router
+    from kairoswarm_core.routes.personalities import router as personalities_router
+    from kairoswarm_core.routes.ui_control import router as ui_control_router
+    from kairoswarm_core.routes.portals import router as portals_router
+
+    api.include_router(runtime_router)
+    api.include_router(memory_router)
+    api.include_router(reload_router)
+    api.include_router(users_router)
+    api.include_router(auth_router, prefix="/auth", tags=["auth"])
+    api.include_router(autoregister_router)
+    api.include_router(swarms_router, prefix="/swarm", tags=["swarms"])
+    api.include_router(persistent_runtime_router, prefix="/persistent", tags=["persistent"])
+    api.include_router(ephemeral_runtime_router, prefix="/swarm", tags=["swarms"])
+    api.include_router(conversation_runtime_router, tags=["conversations"])
+    api.include_router(payments_router, prefix="/payments", tags=["payments"])
+    api.include_router(accounts_router, prefix="/accounts", tags=["accounts"])
+    api.include_router(alerts_router, tags=["alerts"])
+    api.include_router(personalities_router, prefix="/personalities", tags=["personalities"])
+    api.include_router(ui_control_router, prefix="/control", tags=["control"])
+    api.include_router(portals_router, prefix="/portals", tags=["portals"])
+    api.include_router(metrics_router)
+
+
+def create_api(warm_up=True) -> FastAPI:
+    api = FastAPI(lifespan=lifespan if warm_up else None)
+    api.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "https://kairoswarm-project.vercel.app",
+            "https://kairoswarm.nextminds.network",
+            "https://kairoswarm.com",
+            "https://www.kairoswarm.com"
+        ],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Server-Timing", "X-Tape-First-Seq"],
+    )
+    api.add_middleware(MetricsMiddleware)
+    include_routers(api)
+    return api
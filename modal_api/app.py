@@ -1,64 +1,4 @@
-import os
-
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from modal import App, asgi_app, Image, Secret
-
-from modal_api.routes.runtime import router as runtime_router
-from modal_api.routes.memory import router as memory_router
-from modal_api.routes.reload import router as reload_router
-from modal_api.routes.users import router as users_router
-from modal_api.routes.auth import router as auth_router
-from modal_api.routes.autoregister import router as autoregister_router
-from modal_api.routes.swarms_deprecated import router as swarms_router
-#from kairoswarm_core.routes.swarms import router as swarms_router
-from kairoswarm_core.routes.persistent_runtime import router as persistent_runtime_router
-from kairoswarm_core.routes.ephemeral_runtime import router as ephemeral_runtime_router
-#from kairoswarm_core.routes.conversation_runtime import router as conversation_runtime_router
-from kairoswarm_core.routes.conversation_ws import router as conversation_runtime_router
-from kairoswarm_core.routes.payments import router as payments_router
-from kairoswarm_core.routes.accounts import router as accounts_router
-from kairoswarm_core.routes.alerts import router as alerts_router
-from kairoswarm_core.routes.personalities import router as personalities_router
-
-from kairoswarm_core.memory_core.memory_store import MemoryStore
-from kairoswarm_core.agent_updater.update_assistants import reload_agent
-
-from kairoswarm_core.routes.ui_control import router as ui_control_router
-from kairoswarm_core.routes.portals import router as portals_router
-
-
-# --- FastAPI Setup ---
-api = FastAPI()
-api.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "https://kairoswarm-project.vercel.app",
-        "https://kairoswarm.nextminds.network",
-        "https://kairoswarm.com",
-        "https://www.kairoswarm.com"
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-api.include_router(runtime_router)
-api.include_router(memory_router)
-api.include_router(reload_router)
-api.include_router(users_router)
-api.include_router(auth_router, prefix="/auth", tags=["auth"])
-api.include_router(autoregister_router)
-api.include_router(swarms_router, prefix="/swarm", tags=["swarms"])
-api.include_router(persistent_runtime_router, prefix="/persistent", tags=["persistent"])
-api.include_router(ephemeral_runtime_router, prefix="/swarm", tags=["swarms"])
-api.include_router(conversation_runtime_router, tags=["conversations"])
-api.include_router(payments_router, prefix="/payments", tags=["payments"])
-api.include_router(accounts_router, prefix="/accounts", tags=["accounts"])
-api.include_router(alerts_router, tags=["alerts"])
-api.include_router(personalities_router, prefix="/personalities", tags=["personalities"])
-api.include_router(ui_control_router, prefix="/control", tags=["control"])
-api.include_router(portals_router, prefix="/portals", tags=["portals"])
+from modal import App, asgi_app, Cron, Image, Period, Secret
 
 
 # --- Modal Image Definition ---
@@ -81,7 +21,8 @@ image = (
         "pip install stripe",
         "pip install -e /root/kairoswarm-internal",
         "pip install websockets",
-        "pip install pillow"
+        "pip install pillow",
+        "pip install orjson msgpack zstandard"
     )
     .env({
            "PYTHONPATH": "/root/modal_api:/root/kairoswarm-internal"
@@ -111,4 +52,41 @@ app = App(
 @app.function()
 @asgi_app()
 def fastapi_app():
-    return api
+    from modal_api.api import create_api
+    return create_api()
+
+# --- Scheduled Jobs ---
+@app.function(schedule=Cron("17 * * * *"), timeout=1800)
+def compact_memories():
+    """Hourly: purge expired agent memories and merge near-duplicates."""
+    import asyncio
+
+    from modal_api.utils.memory_maintenance import maintenance_enabled, run_memory_maintenance
+    if not maintenance_enabled():
+        print("⚠️ Memory maintenance is opt-in (POSTGRES_URL and MEMORY_MAINTENANCE=1), skipping")
+        return None
+
+    report = asyncio.run(run_memory_maintenance())
+    print(report)
+    return report
+
+@app.function(schedule=Period(minutes=1), timeout=600)
+def drain_memory_queue():
+    """Every minute: store memories queued by /log-memory?async=1 until the stream is empty."""
+    import asyncio
+    from modal_api.utils.memory_ingest import run_worker
+
+    asyncio.run(run_worker(until_idle=True))
+
+@app.function(schedule=Period(minutes=10), timeout=300)
+def refill_thread_pool():
+    """Every 10 minutes: top up the pool of pre-created OpenAI threads used by add/reload-agent."""
+    import asyncio
+    from modal_api.utils.services import get_redis
+    from modal_api.utils.thread_pool import refill
+
+    async def run():
+        async with get_redis() as r:
+            return await refill(r)
+
+    print(f"Added {asyncio.run(run())} pooled threads")
@@ -0,0 +1,158 @@
+# modal_api/benchmarks/agent_search.py
+#
+# Agent marketplace search latency vs catalog size, on a scratch table shaped like the
+# Supabase `agents` table. For each size: exact scan vs the partial HNSW index, without
+# filters and with price / free-tier / skill filters, with p50/p95 latency and recall@k
+# against the exact result. About 80% of generated agents are published.
+#
+# Usage (Postgres with the vector extension, e.g. a local pgvector container):
+#   POSTGRES_URL=postgresql://localhost/kairoswarm \
+#   python -m modal_api.benchmarks.agent_search --sizes 1000 10000 100000 --queries 50
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from modal_api.utils import agent_search
+
+TABLE = "agent_search_bench"
+SKILLS = ["writing", "coding", "research", "sales", "design", "support", "finance", "legal"]
+
+FILTER_CASES = {
+    "none": {},
+    "max_price": {"max_price": 20.0},
+    "free_tier": {"free_tier": True},
+    "skills": {"skills": ["coding"]},
+    "combined": {"max_price": 50.0, "free_tier": True, "skills": ["research"]},
+}
+
+
+async def create_table(pool, n, dim):
+    await pool.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    await pool.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await pool.execute(f"""
+        CREATE TABLE {TABLE} (
+            id                uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            name              text NOT NULL,
+            description       text,
+            skills            text[],
+            has_free_tier     boolean NOT NULL DEFAULT true,
+            price             numeric NOT NULL DEFAULT 0,
+            is_negotiable     boolean NOT NULL DEFAULT false,
+            user_id           text,
+            is_published      boolean NOT NULL DEFAULT false,
+            vector_embedding  vector({dim})
+        )
+    """)
+    # `WHERE g.i > 0` correlates the subqueries so every row gets its own values
+    for start in range(0, n, 20_000):
+        count = min(20_000, n - start)
+        await pool.execute(f"""
+            INSERT INTO {TABLE} (name, description, skills, has_free_tier, price, is_published, vector_embedding)
+            SELECT 'Agent ' || g.i, 'Benchmark agent ' || g.i,
+                   (SELECT array_agg(s) FROM unnest($1::text[]) AS s WHERE random() < 0.3 AND g.i > 0),
+                   g.i % 2 = 0,
+                   round((random() * 100)::numeric, 2),
+                   g.i % 5 <> 0,
+                   (SELECT array_agg(random() - 0.5)::real[] FROM generate_series(1, {dim}) WHERE g.i > 0)::vector
+            FROM generate_series($2::int, $3::int) AS g(i)
+        """, SKILLS, start + 1, start + count)
+    await pool.execute(f"ANALYZE {TABLE}")
+
+
+async def build_index(pool):
+    agent_search._indexed_tables.discard(TABLE)
+    start = time.perf_counter()
+    await agent_search.ensure_agent_indexes(pool, table=TABLE)
+    return time.perf_counter() - start
+
+
+async def sample_queries(pool, count, noise, seed=0):
+    rows = await pool.fetch(
+        f"SELECT vector_embedding::text AS e FROM {TABLE} WHERE is_published ORDER BY random() LIMIT $1", count
+    )
+    rng = random.Random(seed)
+    return [[float(x) + rng.gauss(0, noise) for x in row["e"].strip("[]").split(",")] for row in rows]
+
+
+async def run_queries(pool, queries, k, **kwargs):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        rows = await agent_search.search_agents(q, limit=k, pool=pool, table=TABLE, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1e3)
+        results.append([row["id"] for row in rows])
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[max(0, round(0.95 * len(latencies)) - 1)],
+    }, results
+
+
+def recall(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / max(1, sum(len(t) for t in truth))
+
+
+async def bench_size(pool, n, args):
+    print(f"📦 {n} agents, dim {args.dim}")
+    start = time.perf_counter()
+    await create_table(pool, n, args.dim)
+    print(f"   load {time.perf_counter() - start:.1f} s, index build {await build_index(pool):.1f} s")
+
+    queries = await sample_queries(pool, args.queries, args.noise)
+    result = {}
+    for case, filters in FILTER_CASES.items():
+        exact, truth = await run_queries(pool, queries, args.k, exact=True, **filters)
+        ann, found = await run_queries(pool, queries, args.k, ef_search=args.ef_search, **filters)
+        r = recall(truth, found)
+        result[case] = {"exact": exact, "ann": dict(ann, recall=r)}
+        print(f"   {case:<12}{exact['p50_ms']:>10.2f}{exact['p95_ms']:>10.2f}"
+              f"{ann['p50_ms']:>10.2f}{ann['p95_ms']:>10.2f}{r:>10.3f}")
+    print()
+    return result
+
+
+async def main_async(args):
+    import asyncpg
+
+    pool = await asyncpg.create_pool(dsn=args.dsn, min_size=1, max_size=2)
+    try:
+        print(f"{'':<15}{'exact p50':>10}{'p95':>10}{'hnsw p50':>10}{'p95':>10}{'recall':>10}")
+        results = {n: await bench_size(pool, n, args) for n in args.sizes}
+        if not args.keep:
+            await pool.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        return results
+    finally:
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent marketplace search latency vs catalog size")
+    parser.add_argument("--dsn", default=os.getenv("POSTGRES_URL"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=40)
+    parser.add_argument("--noise", type=float, default=0.05, help="stddev added to sampled query vectors")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch table afterwards")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set POSTGRES_URL or pass --dsn")
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ("json", "dsn")},
+                       "results": results}, f, indent=2)
+        print(f"💾 Saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
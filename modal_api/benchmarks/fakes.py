@@ -0,0 +1,301 @@
+# modal_api/benchmarks/fakes.py
+#
+# In-process stand-ins for the paid upstreams (OpenAI, Supabase, Stripe) and for
+# MemoryStore, each with configurable injected latency. The HTTP fakes are served
+# by one local FastAPI app; the SDKs are pointed at it through their base URLs, so
+# the routes under test run unmodified.
+
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBEDDING_DIM = 1536
+
+
+@dataclass
+class Latency:
+    """Injected latency in milliseconds: a fixed base plus uniform jitter."""
+    base_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    def sample(self) -> float:
+        return max(0.0, self.base_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+
+    async def wait(self):
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def fake_embedding(text: str) -> list[float]:
+    rng = random.Random(hash(text))
+    return [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)]
+
+
+def create_upstream_app(
+    openai_latency: Latency,
+    supabase_latency: Latency,
+    stripe_latency: Latency,
+    run_latency: Latency = Latency(1000.0, 200.0),
+) -> FastAPI:
+    upstream = FastAPI()
+    now = lambda: int(time.time())
+    threads = {}  # thread_id -> list of message objects, oldest first
+    runs = {}     # run_id -> run object plus the time it completes
+
+    # --- OpenAI (base_url = <server>/openai/v1) ---
+
+    @upstream.get("/openai/v1/assistants/{assistant_id}")
+    async def retrieve_assistant(assistant_id: str):
+        await openai_latency.wait()
+        return {
+            "id": assistant_id,
+            "object": "assistant",
+            "created_at": now(),
+            "name": f"Fake {assistant_id[-4:]}",
+            "model": "gpt-4o-mini",
+            "instructions": "You are a load-test assistant.",
+            "tools": [],
+            "metadata": {},
+        }
+
+    @upstream.post("/openai/v1/threads")
+    async def create_thread():
+        await openai_latency.wait()
+        return {"id": f"thread_{uuid.uuid4().hex[:24]}", "object": "thread", "created_at": now(), "metadata": {}}
+
+    def message_object(thread_id, role, text, run_id=None):
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "object": "thread.message",
+            "created_at": now(),
+            "thread_id": thread_id,
+            "role": role,
+            "run_id": run_id,
+            "assistant_id": None,
+            "attachments": [],
+            "metadata": {},
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        }
+
+    def run_object(run):
+        public = {k: v for k, v in run.items() if not k.startswith("_")}
+        if public["status"] in ("queued", "in_progress") and time.monotonic() >= run["_done_at"]:
+            public["status"] = run["status"] = "completed"
+            threads.setdefault(run["thread_id"], []).append(
+                message_object(run["thread_id"], "assistant", f"Reply from {run['assistant_id']}", run["id"])
+            )
+        return public
+
+    @upstream.post("/openai/v1/threads/{thread_id}/messages")
+    async def create_message(thread_id: str, request: Request):
+        body = await request.json()
+        await openai_latency.wait()
+        message = message_object(thread_id, body.get("role", "user"), str(body.get("content", "")))
+        threads.setdefault(thread_id, []).append(message)
+        return message
+
+    @upstream.get("/openai/v1/threads/{thread_id}/messages")
+    async def list_messages(thread_id: str, request: Request):
+        await openai_latency.wait()
+        messages = list(threads.get(thread_id, []))
+        if request.query_params.get("run_id"):
+            messages = [m for m in messages if m["run_id"] == request.query_params["run_id"]]
+        if request.query_params.get("order", "desc") == "desc":
+            messages.reverse()
+        messages = messages[:int(request.query_params.get("limit", 20))]
+        return {
+            "object": "list",
+            "data": messages,
+            "first_id": messages[0]["id"] if messages else None,
+            "last_id": messages[-1]["id"] if messages else None,
+            "has_more": False,
+        }
+
+    async def stream_run(run):
+        """SSE events of a streamed run: the reply's words arrive evenly over the run latency."""
+        def event(name, data):
+            return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+        yield event("thread.run.created", run_object(run))
+        words = f"Streamed reply from {run['assistant_id']} about the swarm economy".split()
+        message = message_object(run["thread_id"], "assistant", "", run["id"])
+        message["status"] = "in_progress"
+        yield event("thread.message.created", message)
+
+        step = max(0.0, run["_done_at"] - time.monotonic()) / len(words)
+        for i, word in enumerate(words):
+            await asyncio.sleep(step)
+            yield event("thread.message.delta", {
+                "id": message["id"],
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": (" " if i else "") + word}}]},
+            })
+
+        message["status"] = "completed"
+        message["content"][0]["text"]["value"] = " ".join(words)
+        threads.setdefault(run["thread_id"], []).append(message)
+        run["status"] = "completed"
+        yield event("thread.message.completed", message)
+        yield event("thread.run.completed", run_object(run))
+        yield "event: done\ndata: [DONE]\n\n"
+
+    @upstream.post("/openai/v1/threads/{thread_id}/runs")
+    async def create_run(thread_id: str, request: Request):
+        body = await request.json()
+        await openai_latency.wait()
+        run_id = f"run_{uuid.uuid4().hex[:24]}"
+        run = runs[run_id] = {
+            "id": run_id,
+            "object": "thread.run",
+            "created_at": now(),
+            "thread_id": thread_id,
+            "assistant_id": body.get("assistant_id"),
+            "status": "queued",
+            "_done_at": time.monotonic() + run_latency.sample(),
+        }
+        if body.get("stream"):
+            return StreamingResponse(stream_run(run), media_type="text/event-stream")
+        return run_object(run)
+
+    @upstream.get("/openai/v1/threads/{thread_id}/runs/{run_id}")
+    async def retrieve_run(thread_id: str, run_id: str):
+        await openai_latency.wait()
+        # Ask the SDK's poller to come back soon rather than after its 1 s default
+        return JSONResponse(run_object(runs[run_id]), headers={"openai-poll-after-ms": "50"})
+
+    @upstream.post("/openai/v1/threads/{thread_id}/runs/{run_id}/cancel")
+    async def cancel_run(thread_id: str, run_id: str):
+        await openai_latency.wait()
+        runs[run_id]["status"] = "cancelled"
+        return run_object(runs[run_id])
+
+    @upstream.post("/openai/v1/embeddings")
+    async def create_embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await openai_latency.wait()
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(str(text))}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        }
+
+    # --- Supabase PostgREST (SUPABASE_URL = <server>/supabase) ---
+
+    @upstream.get("/supabase/rest/v1/{table}")
+    async def select_rows(table: str, request: Request):
+        await supabase_latency.wait()
+        row_id = request.query_params.get("id", "eq.fake").removeprefix("eq.")
+        row = {
+            "id": row_id,
+            "name": f"Agent {row_id[:6]}",
+            "openai_id": f"asst_{row_id[:24]}",
+            "system_prompt": "You are a load-test agent.",
+            "voice": None,
+            "user_id": "00000000-0000-0000-0000-000000000000",
+        }
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            return row
+        return [row]
+
+    @upstream.patch("/supabase/rest/v1/{table}")
+    @upstream.post("/supabase/rest/v1/{table}")
+    async def write_rows(table: str):
+        await supabase_latency.wait()
+        return []
+
+    # --- Stripe (stripe.api_base = <server>/stripe) ---
+
+    @upstream.api_route("/stripe/v1/{path:path}", methods=["GET", "POST", "DELETE"])
+    async def stripe_any(path: str):
+        await stripe_latency.wait()
+        kind = path.split("/")[0].rstrip("s")
+        return {"id": f"{kind}_{uuid.uuid4().hex[:14]}", "object": kind, "livemode": False}
+
+    @upstream.exception_handler(Exception)
+    async def upstream_error(request: Request, exc: Exception):
+        return JSONResponse(status_code=500, content={"error": {"message": str(exc)}})
+
+    return upstream
+
+
+class FakeMemoryStore:
+    """
+    Same async surface as kairoswarm_core's MemoryStore, backed by a process-wide dict.
+    Search is a linear scan, like an unindexed table.
+    """
+    rows: dict = {}
+    latency = Latency()
+
+    async def init(self):
+        await self.latency.wait()
+
+    async def log_memory(self, agent_id, type, content, user_id, embedding, tags=None, relevance=1.0, expires_at=None):
+        await self.latency.wait()
+        self.rows.setdefault((agent_id, user_id), []).append({
+            "id": str(uuid.uuid4()),
+            "agent_id": agent_id,
+            "user_id": user_id,
+            "type": type,
+            "content": content,
+            "embedding": embedding,
+            "tags": tags,
+            "relevance": relevance,
+            "expires_at": expires_at,
+        })
+
+    async def search_memories(self, agent_id, user_id, embedding, limit=10):
+        await self.latency.wait()
+        rows = self.rows.get((agent_id, user_id), [])
+        scored = sorted(rows, key=lambda m: -sum(a * b for a, b in zip(m["embedding"], embedding)))
+        return scored[:limit]
+
+    async def get_memories(self, agent_id, user_id, type=None, tags=None, limit=10):
+        await self.latency.wait()
+        rows = self.rows.get((agent_id, user_id), [])
+        if type:
+            rows = [m for m in rows if m["type"] == type]
+        if tags:
+            rows = [m for m in rows if set(tags) & set(m["tags"] or [])]
+        return rows[-limit:]
+
+
+class BackgroundServer:
+    """Runs a uvicorn server on its own thread and event loop."""
+
+    def __init__(self, app, host="127.0.0.1", port=0):
+        self.config = uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(self.config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self):
+        sock = self.server.servers[0].sockets[0]
+        host, port = sock.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, timeout=15.0):
+        self.thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline or not self.thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
@@ -0,0 +1,244 @@
+# modal_api/benchmarks/loadtest.py
+#
+# Boots the FastAPI `api` locally against a local Redis, with OpenAI / Supabase /
+# Stripe / MemoryStore replaced by in-process fakes, and drives the hot endpoints at
+# a fixed concurrency. Reports p50/p95/p99 latency and req/s per endpoint.
+#
+# Usage (from the repo root, with a local redis-server running):
+#   python -m modal_api.benchmarks.loadtest --requests 500 --concurrency 20 \
+#       --openai-latency-ms 250 --supabase-latency-ms 40 --json loadtest.json
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+
+import httpx
+
+from modal_api.benchmarks.fakes import BackgroundServer, FakeMemoryStore, Latency, create_upstream_app
+
+SCENARIOS = ["join", "add-agent", "tape", "log-memory", "get-memories"]
+AGENT_ID = "bench-agent"
+
+
+def configure_environment(upstream_url, redis_url):
+    """Must run before the api is built so the SDKs pick up the fake base URLs."""
+    os.environ["REDIS_URL"] = redis_url
+    os.environ["OPENAI_API_KEY"] = "sk-loadtest"
+    os.environ["OPENAI_BASE_URL"] = f"{upstream_url}/openai/v1"
+    os.environ["SUPABASE_URL"] = f"{upstream_url}/supabase"
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "loadtest.fake.key"
+    os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_loadtest")
+
+
+def load_api(upstream_url, memory_latency, real_memory_store):
+    from modal_api.api import create_api
+    import stripe
+
+    stripe.api_base = f"{upstream_url}/stripe"
+    api = create_api()
+
+    if not real_memory_store:
+        import modal_api.routes.memory as memory_routes
+        import modal_api.utils.memory_ingest as memory_ingest
+        FakeMemoryStore.latency = memory_latency
+        store = FakeMemoryStore()
+
+        async def get_fake_memory_store():
+            return store
+
+        # Every module that resolves the store: the routes read it, memory_ingest writes it
+        for module in (memory_routes, memory_ingest):
+            module.get_memory_store = get_fake_memory_store
+
+    return api
+
+
+def request_for(scenario, i, sid):
+    """(method, path, kwargs) for the i-th request of a scenario."""
+    if scenario == "join":
+        return "POST", "/swarm/join", {"json": {"swarm_id": sid, "name": f"Guest {i}"}}
+    if scenario == "add-agent":
+        return "POST", "/add-agent", {"json": {"agentId": f"asst_{i:06d}", "swarm_id": sid}}
+    if scenario == "tape":
+        return "GET", "/tape", {"params": {"swarm_id": sid}}
+    if scenario == "log-memory":
+        return "POST", "/log-memory", {"json": {
+            "agent_id": AGENT_ID,
+            "message": f"Load-test memory {i}: the swarm discussed cooperation and markets.",
+            "tags": ["loadtest"],
+        }}
+    if scenario == "get-memories":
+        return "GET", "/get-memories", {"params": {"agent_id": AGENT_ID, "query": f"cooperation {i % 10}"}}
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def is_error(response):
+    if response.status_code >= 400:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    # Several routes report failures in a 200 body
+    return isinstance(body, dict) and ("error" in body or body.get("status") == "error")
+
+
+async def run_scenario(client, scenario, sid, total, concurrency):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, path, kwargs = request_for(scenario, i, sid)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                failed = is_error(response)
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    return summarize(latencies, wall, errors)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, wall, errors):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "wall_s": wall,
+        "rps": len(ordered) / wall if wall else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1e3 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1e3,
+        "p95_ms": percentile(ordered, 95) * 1e3,
+        "p99_ms": percentile(ordered, 99) * 1e3,
+        "max_ms": ordered[-1] * 1e3 if ordered else 0.0,
+    }
+
+
+async def prepare_swarm(client, redis_url, tape_size):
+    response = await client.post("/swarm/create", json={"name": "Load Test"})
+    response.raise_for_status()
+    sid = response.json()["id"]
+
+    import redis.asyncio as redis
+
+    async with redis.from_url(redis_url, decode_responses=True) as r:
+        entries = [
+            json.dumps({
+                "from": f"Guest {i % 7}",
+                "type": "human",
+                "message": f"Message {i} about the swarm economy and its participants.",
+                "timestamp": "2025-01-01T00:00:00",
+            })
+            for i in range(tape_size)
+        ]
+        for start in range(0, len(entries), 1000):
+            await r.rpush(f"{sid}:conversation_tape", *entries[start:start + 1000])
+    return sid
+
+
+async def cleanup_swarm(redis_url, sid):
+    import redis.asyncio as redis
+
+    async with redis.from_url(redis_url, decode_responses=True) as r:
+        keys = [k async for k in r.scan_iter(f"{sid}:*")]
+        if keys:
+            await r.delete(*keys)
+
+
+async def drive(base_url, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        sid = await prepare_swarm(client, args.redis_url, args.tape_size)
+        results = {}
+        try:
+            for scenario in args.scenarios:
+                if args.warmup:
+                    await run_scenario(client, scenario, sid, args.warmup, min(args.concurrency, args.warmup))
+                results[scenario] = await run_scenario(client, scenario, sid, args.requests, args.concurrency)
+                print_row(scenario, results[scenario])
+        finally:
+            await cleanup_swarm(args.redis_url, sid)
+        return results
+
+
+def print_header():
+    print(f"{'endpoint':<14}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+
+def print_row(scenario, s):
+    print(
+        f"{scenario:<14}{s['requests']:>7}{s['errors']:>8}{s['rps']:>10.1f}"
+        f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kairoswarm API load test")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint")
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--tape-size", type=int, default=200, help="entries preloaded into the swarm tape")
+    parser.add_argument("--redis-url", default=os.getenv("LOADTEST_REDIS_URL", "redis://localhost:6379/15"))
+    parser.add_argument("--openai-latency-ms", type=float, default=200.0)
+    parser.add_argument("--supabase-latency-ms", type=float, default=30.0)
+    parser.add_argument("--stripe-latency-ms", type=float, default=150.0)
+    parser.add_argument("--memory-latency-ms", type=float, default=10.0)
+    parser.add_argument("--jitter", type=float, default=0.2, help="jitter as a fraction of each latency")
+    parser.add_argument("--real-memory-store", action="store_true", help="use MemoryStore against POSTGRES_URL")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    latency = lambda ms: Latency(ms, ms * args.jitter)
+    upstream = BackgroundServer(create_upstream_app(
+        openai_latency=latency(args.openai_latency_ms),
+        supabase_latency=latency(args.supabase_latency_ms),
+        stripe_latency=latency(args.stripe_latency_ms),
+    )).start()
+
+    configure_environment(upstream.url, args.redis_url)
+    api = load_api(upstream.url, latency(args.memory_latency_ms), args.real_memory_store)
+    server = BackgroundServer(api).start()
+
+    print(f"🚀 API at {server.url}, fakes at {upstream.url}, redis {args.redis_url}")
+    print(f"   {args.requests} requests/endpoint at concurrency {args.concurrency}\n")
+    print_header()
+    try:
+        results = asyncio.run(drive(server.url, args))
+    finally:
+        server.stop()
+        upstream.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "run_id": str(uuid.uuid4()),
+                "config": {k: v for k, v in vars(args).items() if k != "json"},
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
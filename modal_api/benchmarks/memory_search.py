@@ -0,0 +1,151 @@
+# modal_api/benchmarks/memory_search.py
+#
+# Exact vs HNSW memory search on a scratch pgvector table, at several table sizes.
+# Reports p50/p95 latency per query and recall@k against the exact result, for a few
+# ef_search values. Rows are generated server-side (random unit-ish vectors); queries
+# are perturbed copies of stored rows, so every query has true near neighbors.
+#
+# Usage (Postgres with the vector extension, e.g. a local pgvector container):
+#   POSTGRES_URL=postgresql://localhost/kairoswarm \
+#   python -m modal_api.benchmarks.memory_search --sizes 10000 100000 1000000 --queries 50
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from modal_api.utils import memory_db
+
+TABLE = "memory_search_bench"
+AGENT_ID = "bench-agent"
+USER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+async def create_table(pool, n, dim):
+    await pool.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    await pool.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await pool.execute(f"""
+        CREATE TABLE {TABLE} (
+            id          bigserial PRIMARY KEY,
+            agent_id    text NOT NULL,
+            user_id     text NOT NULL,
+            type        text NOT NULL,
+            content     text NOT NULL,
+            embedding   vector({dim}) NOT NULL,
+            tags        text[],
+            relevance   real NOT NULL DEFAULT 1.0,
+            expires_at  timestamptz,
+            created_at  timestamptz NOT NULL DEFAULT now()
+        )
+    """)
+    # `WHERE g.i > 0` correlates the subquery so every row gets its own vector
+    for start in range(0, n, 50_000):
+        count = min(50_000, n - start)
+        await pool.execute(f"""
+            INSERT INTO {TABLE} (agent_id, user_id, type, content, embedding, tags)
+            SELECT $1, $2,
+                   (ARRAY['experience', 'fact', 'reflection'])[1 + g.i % 3],
+                   'memory ' || g.i,
+                   (SELECT array_agg(random() - 0.5)::real[] FROM generate_series(1, {dim}) WHERE g.i > 0)::vector,
+                   ARRAY['tag' || (g.i % 10)]
+            FROM generate_series($3::int, $4::int) AS g(i)
+        """, AGENT_ID, USER_ID, start + 1, start + count)
+    await pool.execute(f"ANALYZE {TABLE}")
+
+
+async def build_index(pool):
+    memory_db._indexed_tables.discard(TABLE)
+    start = time.perf_counter()
+    await memory_db.ensure_memory_indexes(pool, table=TABLE)
+    return time.perf_counter() - start
+
+
+async def sample_queries(pool, count, noise, seed=0):
+    rows = await pool.fetch(f"SELECT embedding::text AS e FROM {TABLE} ORDER BY random() LIMIT $1", count)
+    rng = random.Random(seed)
+    return [[float(x) + rng.gauss(0, noise) for x in row["e"].strip("[]").split(",")] for row in rows]
+
+
+async def run_queries(pool, queries, k, **kwargs):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        rows = await memory_db.search_memories(
+            AGENT_ID, USER_ID, q, limit=k, fields=["id"], pool=pool, table=TABLE, **kwargs
+        )
+        latencies.append((time.perf_counter() - start) * 1e3)
+        results.append([row["id"] for row in rows])
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[max(0, round(0.95 * len(latencies)) - 1)],
+    }, results
+
+
+def recall(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / max(1, sum(len(t) for t in truth))
+
+
+async def bench_size(pool, n, args):
+    print(f"📦 {n} memories, dim {args.dim}")
+    start = time.perf_counter()
+    await create_table(pool, n, args.dim)
+    print(f"   load {time.perf_counter() - start:.1f} s, index build {await build_index(pool):.1f} s")
+
+    queries = await sample_queries(pool, args.queries, args.noise)
+    exact, truth = await run_queries(pool, queries, args.k, exact=True)
+    print(f"   {'exact':<16}{exact['p50_ms']:>10.2f}{exact['p95_ms']:>10.2f}{1.0:>10.3f}")
+    result = {"exact": dict(exact, recall=1.0), "ann": {}}
+
+    for ef in args.ef_search:
+        ann, found = await run_queries(pool, queries, args.k, ef_search=ef)
+        r = recall(truth, found)
+        result["ann"][ef] = dict(ann, recall=r)
+        print(f"   {'hnsw ef=' + str(ef):<16}{ann['p50_ms']:>10.2f}{ann['p95_ms']:>10.2f}{r:>10.3f}")
+    print()
+    return result
+
+
+async def main_async(args):
+    import asyncpg
+
+    pool = await asyncpg.create_pool(dsn=args.dsn, min_size=1, max_size=2)
+    try:
+        print(f"{'':<19}{'p50 ms':>10}{'p95 ms':>10}{'recall':>10}")
+        results = {n: await bench_size(pool, n, args) for n in args.sizes}
+        if not args.keep:
+            await pool.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        return results
+    finally:
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact vs HNSW memory search benchmark")
+    parser.add_argument("--dsn", default=os.getenv("POSTGRES_URL"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[20, 40, 100, 200])
+    parser.add_argument("--noise", type=float, default=0.05, help="stddev added to sampled query vectors")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch table afterwards")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set POSTGRES_URL or pass --dsn")
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ("json", "dsn")},
+                       "results": results}, f, indent=2)
+        print(f"💾 Saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# modal_api/benchmarks/serialization.py
+#
+# Time to turn a tape, as Redis returns it, into a /tape response body. Compares the
+# old path (json.loads per entry, then FastAPI's encoder), orjson decode + encode, and
+# the raw passthrough used by /tape today, for each record codec. Also reports the
+# stored size per codec.
+#
+# Usage: python -m modal_api.benchmarks.serialization [--entries 10000] [--repeat 7] [--json out.json]
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from modal_api.utils import responses, serialization
+from modal_api.utils.responses import json_array_response
+from modal_api.utils.serialization import decode_record, encode_record
+
+WORDS = "swarm agent market signal memory cooperation value trust price offer".split()
+
+
+def make_tape(n, seed=0):
+    rng = random.Random(seed)
+    tape = []
+    for i in range(n):
+        # Mostly chat-sized messages with the occasional long agent reply
+        length = rng.choice([8, 12, 20, 40, 400])
+        tape.append({
+            "from": rng.choice(["Guest 1", "Guest 2", "Kairo", "Nova", "system"]),
+            "type": rng.choice(["human", "agent", "system"]),
+            "message": " ".join(rng.choice(WORDS) for _ in range(length)),
+            "timestamp": f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+        })
+    return tape
+
+
+def stored(tape, codec):
+    """Entries as a bytes Redis client returns them."""
+    out = []
+    for entry in tape:
+        raw = encode_record(entry, codec)
+        out.append(raw.encode("utf-8") if isinstance(raw, str) else raw)
+    return out
+
+
+def body_stdlib(raw):
+    # What /tape did before: decode every entry, then FastAPI's JSONResponse
+    entries = [json.loads(x) if not serialization.is_binary_record(x) else decode_record(x) for x in raw]
+    return json.dumps(jsonable_encoder(entries), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def body_orjson(raw):
+    return responses.dumps([decode_record(x) for x in raw])
+
+
+def body_passthrough(raw):
+    return json_array_response(raw).body
+
+
+STRATEGIES = {
+    "stdlib decode+encode": body_stdlib,
+    "orjson decode+encode": body_orjson,
+    "raw passthrough": body_passthrough,
+}
+
+
+def time_ms(fn, arg, repeat):
+    fn(arg)  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(samples), min(samples)
+
+
+def available_codecs():
+    codecs = ["json"]
+    if serialization.orjson is not None:
+        codecs.append("orjson")
+    if serialization.msgpack is not None:
+        codecs.append("msgpack")
+        if serialization.zstandard is not None:
+            codecs.append("msgpack+zstd")
+    return codecs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tape serialization benchmark")
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    tape = make_tape(args.entries)
+    print(f"📼 {args.entries} tape entries, orjson {'on' if responses.orjson else 'off'}\n")
+    print(f"{'codec':<14}{'stored KiB':>12}  {'strategy':<22}{'median ms':>11}{'min ms':>9}{'body KiB':>10}")
+
+    results = {}
+    for codec in available_codecs():
+        raw = stored(tape, codec)
+        size = sum(len(x) for x in raw)
+        results[codec] = {"stored_bytes": size, "strategies": {}}
+        for name, fn in STRATEGIES.items():
+            median, best = time_ms(fn, raw, args.repeat)
+            body = len(fn(raw))
+            results[codec]["strategies"][name] = {"median_ms": median, "min_ms": best, "body_bytes": body}
+            print(f"{codec:<14}{size / 1024:>12.0f}  {name:<22}{median:>11.2f}{best:>9.2f}{body / 1024:>10.0f}")
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"entries": args.entries, "results": results}, f, indent=2)
+        print(f"💾 Saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# modal_api/benchmarks/startup.py
+#
+# Cold-start import cost of the API, measured with `python -X importtime` in fresh
+# interpreters. Reports wall time per phase and the heaviest top-level packages.
+#
+# Usage: python -m modal_api.benchmarks.startup [--runs 5] [--top 15] [--json startup.json]
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PHASES = {
+    # what `modal deploy` loads locally
+    "import modal_api.app": "import modal_api.app",
+    # what a container does before it can serve
+    "create_api()": "from modal_api.api import create_api; create_api(warm_up=False)",
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+
+def run_once(code):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, cwd=REPO_ROOT,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"`{code}` failed:\n{proc.stderr[-2000:]}")
+    return wall, parse_importtime(proc.stderr)
+
+
+def parse_importtime(stderr):
+    """
+    Self microseconds summed per top-level package, so time spent in e.g. openai is
+    charged to openai even when a route module triggered the import.
+    """
+    packages = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, module = match.groups()
+            packages[module.split(".")[0]] += int(self_us)
+    return dict(packages)
+
+
+def measure(code, runs):
+    walls = []
+    per_package = defaultdict(list)
+    for _ in range(runs):
+        wall, packages = run_once(code)
+        walls.append(wall)
+        for name, us in packages.items():
+            per_package[name].append(us)
+    return {
+        "wall_ms_median": statistics.median(walls) * 1e3,
+        "wall_ms_min": min(walls) * 1e3,
+        "packages_ms": {name: statistics.median(v) / 1e3 for name, v in per_package.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API cold-start import benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    baseline = measure("pass", args.runs)["wall_ms_median"]
+    results = {"interpreter_ms": baseline, "phases": {}}
+    print(f"🐍 Bare interpreter: {baseline:.0f} ms\n")
+
+    for phase, code in PHASES.items():
+        try:
+            stats = measure(code, args.runs)
+        except RuntimeError as e:
+            print(f"⚠️ {phase}: {e}\n")
+            continue
+        results["phases"][phase] = stats
+        print(f"⏱️  {phase}: median {stats['wall_ms_median']:.0f} ms (min {stats['wall_ms_min']:.0f} ms)")
+        heaviest = sorted(stats["packages_ms"].items(), key=lambda kv: -kv[1])[:args.top]
+        for name, ms in heaviest:
+            print(f"     {name:<30} {ms:8.1f} ms")
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,9 @@ import os
 import logging
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException, Request
-from modal_api.utils.services import get_supabase
+from modal_api.utils.services import get_supabase, get_stripe
+from modal_api.utils.metrics import span
 from fastapi import Header
-import stripe
 
 router = APIRouter()
 
@@ -17,10 +17,11 @@ class AuthRequest(BaseModel):
 async def signup(auth: AuthRequest):
     try:
         supabase = get_supabase()
-        result = supabase.auth.sign_up({
-            "email": auth.email,
-            "password": auth.password
-        })
+        with span("supabase", "auth.sign_up"):
+            result = supabase.auth.sign_up({
+                "email": auth.email,
+                "password": auth.password
+            })
 
         # Handle successful user creation
         if result.user:
@@ -28,11 +29,12 @@ async def signup(auth: AuthRequest):
             email = result.user.email
 
             # Insert user into our own users table
-            supabase.from_("users").upsert({
-                "id": user_id,
-                "email": email,
-                "display_name": auth.display_name
-            }, on_conflict="id").execute()
+            with span("supabase", "users.upsert"):
+                supabase.from_("users").upsert({
+                    "id": user_id,
+                    "email": email,
+                    "display_name": auth.display_name
+                }, on_conflict="id").execute()
 
 
             return {
@@ -52,10 +54,11 @@ async def signup(auth: AuthRequest):
 async def signin(auth: AuthRequest):
     try:
         supabase = get_supabase()
-        result = supabase.auth.sign_in_with_password({
-            "email": auth.email,
-            "password": auth.password
-        })
+        with span("supabase", "auth.sign_in_with_password"):
+            result = supabase.auth.sign_in_with_password({
+                "email": auth.email,
+                "password": auth.password
+            })
 
         if not result or not result.session or not result.session.user:
             raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -84,7 +87,8 @@ async def get_session(request: Request):
             raise HTTPException(status_code=401, detail="Missing or invalid token")
 
         token = auth_header.split(" ")[1]
-        user_response = supabase.auth.get_user(token)
+        with span("supabase", "auth.get_user"):
+            user_response = supabase.auth.get_user(token)
 
         if not user_response or not user_response.user:
             raise HTTPException(status_code=401, detail="Invalid or expired session")
@@ -109,7 +113,8 @@ class SignOutRequest(BaseModel):
 async def signout(payload: SignOutRequest):
     try:
         supabase = get_supabase()
-        result = supabase.auth.sign_out(payload.access_token)
+        with span("supabase", "auth.sign_out"):
+            result = supabase.auth.sign_out(payload.access_token)
         return { "status": "signed_out" }
     except Exception as e:
         print("Signout error:", e)
@@ -129,21 +134,23 @@ async def get_profile(request: Request):
 
         # 2) Validate & decode it via Supabase
         supabase = get_supabase()
-        user_resp = supabase.auth.get_user(token)
+        with span("supabase", "auth.get_user"):
+            user_resp = supabase.auth.get_user(token)
         if not user_resp or not user_resp.user:
             raise HTTPException(status_code=401, detail="Invalid or expired session")
 
         user = user_resp.user
 
         # 3) Lookup display_name + payout info from our users table
-        profile_resp = (
-            supabase
-            .from_("users")
-            .select("display_name, stripe_account_id, stripe_onboarding_complete")
-            .eq("id", user.id)
-            .single()
-            .execute()
-        )
+        with span("supabase", "users.select"):
+            profile_resp = (
+                supabase
+                .from_("users")
+                .select("display_name, stripe_account_id, stripe_onboarding_complete")
+                .eq("id", user.id)
+                .single()
+                .execute()
+            )
 
         if not profile_resp.data:
             raise HTTPException(status_code=404, detail="User not found in local table")
@@ -154,22 +161,24 @@ async def get_profile(request: Request):
 
         # 4) Check active subscriptions via Stripe
         stripe_mode = os.environ.get("STRIPE_MODE", "test")
-        stripe.api_key = os.environ.get("STRIPE_LIVE_KEY" if stripe_mode == "live" else "STRIPE_SECRET_KEY", "")
+        stripe = get_stripe()
         STRIPE_PREMIUM_PRICE_ID = os.environ.get("STRIPE_LIVE_PREMIUM_PRICE_ID" if stripe_mode == "live" else "STRIPE_PREMIUM_PRICE_ID")
 
-        customers = stripe.Customer.list(email=user.email)
+        with span("stripe", "customers.list"):
+            customers = stripe.Customer.list(email=user.email)
         is_premium = False
 
         if customers.data:
             customer_id = customers.data[0].id
-            stripe_subscriptions = stripe.Subscription.list(customer=customer_id, status="active")
+            with span("stripe", "subscriptions.list"):
+                stripe_subscriptions = stripe.Subscription.list(customer=customer_id, status="active")
 
-            if any(
-                item["price"]["id"] == STRIPE_PREMIUM_PRICE_ID
-                for subscription in stripe_subscriptions.auto_paging_iter()
-                for item in subscription["items"]["data"]
-            ):
-                is_premium = True
+                if any(
+                    item["price"]["id"] == STRIPE_PREMIUM_PRICE_ID
+                    for subscription in stripe_subscriptions.auto_paging_iter()
+                    for item in subscription["items"]["data"]
+                ):
+                    is_premium = True
 
         # 5) Return everything in one shot
         return {
@@ -194,7 +203,8 @@ async def get_current_user(authorization: str = Header(...)):
 
     token = authorization.split(" ")[1]
     supabase = get_supabase()
-    user_response = supabase.auth.get_user(token)
+    with span("supabase", "auth.get_user"):
+        user_response = supabase.auth.get_user(token)
 
     if not user_response or not user_response.user:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
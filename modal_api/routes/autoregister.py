@@ -3,6 +3,7 @@ from pydantic import BaseModel
 import secrets
 
 from modal_api.utils.services import get_supabase
+from modal_api.utils.metrics import span
 
 router = APIRouter()
 
@@ -17,10 +18,11 @@ async def autoregister(req: AutoRegisterRequest):
     password = req.password or secrets.token_urlsafe(16)
 
     try:
-        response = supabase.auth.sign_up({
-            "email": req.email,
-            "password": password
-        })
+        with span("supabase", "auth.sign_up"):
+            response = supabase.auth.sign_up({
+                "email": req.email,
+                "password": password
+            })
 
         if response.error:
             raise HTTPException(status_code=400, detail=response.error.message)
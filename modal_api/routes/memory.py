@@ -1,92 +1,269 @@
 from fastapi import APIRouter, Request
-from kairoswarm_core.memory_core.memory_store import MemoryStore
-from openai import AsyncOpenAI
+from fastapi.responses import JSONResponse
 from typing import Optional
+import asyncio
+import json
+import logging
 import os
+import time
+
+from modal_api.utils import memory_cache, memory_db
+from modal_api.utils.memory_ingest import PartialStoreError, embed_texts, enqueue_memory, ingest_memories
+from modal_api.utils.metrics import span
+from modal_api.utils.responses import FastJSONResponse
+from modal_api.utils.services import get_memory_store, get_redis
 
 router = APIRouter()
 
+# Columns holding vectors; left out of responses unless asked for with `fields=`
+VECTOR_FIELDS = {"embedding"}
+
+
+def parse_fields(raw):
+    """
+    `fields=` query param -> set of field names to return. Missing means every field
+    except vectors; `fields=*` means every field.
+    """
+    if not raw:
+        return None
+    if raw.strip() == "*":
+        return "*"
+    return {f.strip() for f in raw.split(",") if f.strip()}
+
+
+def project_memory(memory, fields=None):
+    if not isinstance(memory, dict):
+        memory = dict(memory)  # asyncpg Record
+    if fields == "*":
+        return memory
+    if fields is None:
+        return {k: v for k, v in memory.items() if k not in VECTOR_FIELDS}
+    return {k: v for k, v in memory.items() if k in fields}
+
+DEFAULT_USER_ID = "00000000-0000-0000-0000-000000000000"
+
+# /log-memories: texts per embeddings call, embedding calls in flight, items per request
+EMBED_BATCH = int(os.getenv("MEMORY_EMBED_BATCH", "256"))
+EMBED_CONCURRENCY = int(os.getenv("MEMORY_EMBED_CONCURRENCY", "4"))
+BULK_MAX_ITEMS = int(os.getenv("MEMORY_BULK_MAX_ITEMS", "20000"))
+
+
+def parse_memory(body):
+    """A /log-memory body -> memory dict without embedding, or None if incomplete."""
+    memory = {
+        "user_id": body.get("user_id", DEFAULT_USER_ID),
+        "agent_id": body.get("agent_id"),
+        "content": body.get("message"),  # "message" for backward compatibility
+        "type": body.get("type", "experience"),
+        "tags": body.get("tags"),
+        "relevance": 1.0 if body.get("relevance") is None else body["relevance"],
+        "expires_at": body.get("expires_at"),
+    }
+    if not memory["agent_id"] or not memory["content"]:
+        return None
+    return memory
+
+
 @router.post("/log-memory")
 async def log_memory(request: Request):
+    """
+    Embeds and stores one memory. With `?async=1` (or "async": true) the memory is
+    queued for the write-behind workers instead and the call returns at once;
+    resubmitting with the same Idempotency-Key header stores it once (barring a worker
+    crash right after the insert; see memory_ingest.py).
+    """
     body = await request.json()
-    user_id = body.get("user_id", "00000000-0000-0000-0000-000000000000")
-    agent_id = body.get("agent_id")
-    content = body.get("message")  # "message" for backward compatibility
-    type = body.get("type", "experience")
-    tags = body.get("tags")
-    relevance = body.get("relevance", 1.0)
-    expires_at = body.get("expires_at")
-
-    if not agent_id or not content:
+    memory = parse_memory(body)
+    if memory is None:
         return {"status": "error", "message": "Missing 'agent_id' or 'message'"}
 
     try:
-        client = AsyncOpenAI()
-        embedding_response = await client.embeddings.create(
-            model="text-embedding-3-small",
-            input=content
-        )
-        embedding = embedding_response.data[0].embedding
-
-        store = MemoryStore()
-        await store.init()
-
-        await store.log_memory(
-            agent_id=agent_id,
-            type=type,
-            content=content,
-            user_id=user_id,
-            embedding=embedding,
-            tags=tags,
-            relevance=relevance,
-            expires_at=expires_at
-        )
+        if request.query_params.get("async") in ("1", "true") or body.get("async") is True:
+            key = request.headers.get("idempotency-key") or body.get("idempotency_key")
+            async with get_redis() as r:
+                entry_id, key = await enqueue_memory(r, memory, key)
+            return JSONResponse(
+                status_code=202,
+                content={"status": "queued", "id": entry_id, "idempotency_key": key},
+            )
 
+        await ingest_memories([memory])
         return {"status": "ok", "message": "Memory logged"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
+def parse_bulk_body(raw, content_type):
+    """NDJSON (one /log-memory body per line), a JSON array, or {"memories": [...]}."""
+    text = raw.decode("utf-8").strip()
+    if "ndjson" not in content_type and "jsonlines" not in content_type:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None  # several lines: NDJSON without the content type
+        if isinstance(data, dict):
+            return data.get("memories", [data])
+        if data is not None:
+            return data
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+@router.post("/log-memories")
+async def log_memories(request: Request):
+    """
+    Bulk /log-memory. Items are embedded EMBED_BATCH at a time, with up to
+    EMBED_CONCURRENCY embedding calls in flight, and each batch is inserted as it
+    completes. A failed batch does not stop the others; failures are reported by index.
+    """
+    started = time.perf_counter()
+    try:
+        items = parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        return {"status": "error", "message": f"Malformed body: {e}"}
+    if not isinstance(items, list):
+        return {"status": "error", "message": "Expected NDJSON, a JSON array or {\"memories\": [...]}"}
+    if len(items) > BULK_MAX_ITEMS:
+        return {"status": "error", "message": f"At most {BULK_MAX_ITEMS} memories per request"}
+
+    memories, rejected = [], []
+    for i, item in enumerate(items):
+        memory = parse_memory(item) if isinstance(item, dict) else None
+        if memory is None:
+            rejected.append({"index": i, "error": "Missing 'agent_id' or 'message'"})
+        else:
+            memories.append((i, memory))
+
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+    failed = []
+
+    async def ingest(batch):
+        async with semaphore:
+            try:
+                return await ingest_memories([m for _, m in batch])
+            except PartialStoreError as e:
+                logging.warning("⚠️ Bulk memory batch partly failed: %s", e)
+                failed.append({"indexes": [batch[j][0] for j in sorted(e.failed)], "error": str(e)})
+                return e.stored
+            except Exception as e:
+                logging.exception("❌ Bulk memory batch failed")
+                failed.append({"indexes": [i for i, _ in batch], "error": str(e)})
+                return 0
+
+    batches = [memories[i:i + EMBED_BATCH] for i in range(0, len(memories), EMBED_BATCH)]
+    inserted = sum(await asyncio.gather(*(ingest(b) for b in batches)))
+
+    seconds = time.perf_counter() - started
+    return {
+        "status": "ok" if not failed and not rejected else "partial",
+        "inserted": inserted,
+        "rejected": rejected,
+        "failed": failed,
+        "seconds": round(seconds, 3),
+        "memories_per_s": round(inserted / seconds, 1) if seconds else None,
+    }
+
+
+async def embed_query(query):
+    return (await embed_texts([query]))[0]
+
+
+def parse_weights(params):
+    """w_similarity / w_relevance / w_recency query params for mode=hybrid."""
+    return {
+        name: float(params[f"w_{name}"])
+        for name in memory_db.RANK_WEIGHTS
+        if params.get(f"w_{name}") is not None
+    }
+
+
 @router.get("/get-memories")
 async def get_memories(request: Request):
+    """
+    Default mode: vector search when `query` is given, else type/tag filtering.
+    mode=hybrid: one ranked query combining filters, expiry, similarity (if `query`),
+    relevance and recency; tune with w_similarity, w_relevance, w_recency, half_life_hours.
+    Query results go through the semantic cache (memory_cache.py) unless cache=0.
+    """
     agent_id = request.query_params.get("agent_id")
-    user_id = request.query_params.get("user_id", "00000000-0000-0000-0000-000000000000")
+    user_id = request.query_params.get("user_id", DEFAULT_USER_ID)
     query = request.query_params.get("query")
     type = request.query_params.get("type")
     tags = request.query_params.get("tags")  # comma-separated
     limit = int(request.query_params.get("limit", 10))
+    fields = parse_fields(request.query_params.get("fields"))
+    mode = request.query_params.get("mode")
+    parsed_tags = tags.split(",") if tags else None
 
     if not agent_id:
         return {"status": "error", "message": "Missing 'agent_id'"}
+    if mode == "hybrid" and not memory_db.ann_enabled():
+        return {"status": "error", "message": "mode=hybrid needs direct memory queries (MEMORY_ANN=1)"}
 
-    try:
-        store = MemoryStore()
-        await store.init()
-
-        if query:
-            client = AsyncOpenAI()
-            embedding_response = await client.embeddings.create(
-                model="text-embedding-3-small",
-                input=query
-            )
-            query_embedding = embedding_response.data[0].embedding
-
-            memories = await store.search_memories(
+    async def search(query_embedding):
+        if mode == "hybrid":
+            return await memory_db.ranked_memories(
                 agent_id=agent_id,
                 user_id=user_id,
                 embedding=query_embedding,
-                limit=limit
+                limit=limit,
+                type=type,
+                tags=parsed_tags,
+                weights=parse_weights(request.query_params),
+                half_life_hours=request.query_params.get("half_life_hours"),
+                ef_search=request.query_params.get("ef_search"),
+                fields=fields,
             )
-        else:
-            parsed_tags = tags.split(",") if tags else None
-            memories = await store.get_memories(
+        if memory_db.ann_enabled():
+            return await memory_db.search_memories(
                 agent_id=agent_id,
                 user_id=user_id,
+                embedding=query_embedding,
+                limit=limit,
                 type=type,
                 tags=parsed_tags,
+                ef_search=request.query_params.get("ef_search"),
+                fields=fields,
+            )
+        store = await get_memory_store()
+        async with span("postgres", "memory_store.search_memories"):
+            return await store.search_memories(
+                agent_id=agent_id,
+                user_id=user_id,
+                embedding=query_embedding,
                 limit=limit
             )
 
-        return {"status": "ok", "memories": memories}
+    try:
+        if query and memory_cache.cache_enabled() and request.query_params.get("cache") != "0":
+            # Cache scope: every param except the query text itself
+            filters = {k: v for k, v in request.query_params.items() if k not in ("query", "agent_id", "user_id")}
+            async with get_redis() as r:
+                scope = await memory_cache.load(r, agent_id, user_id, filters)
+                memories = scope.find(query)
+                if memories is None:
+                    query_embedding = await embed_query(query)
+                    memories = scope.find(query, query_embedding)
+                if memories is None:
+                    memories = [project_memory(m, fields) for m in await search(query_embedding)]
+                    await scope.store(r, query, query_embedding, memories)
+            return FastJSONResponse({"status": "ok", "memories": memories})
+
+        if query:
+            memories = await search(await embed_query(query))
+        elif mode == "hybrid":
+            memories = await search(None)
+        else:
+            store = await get_memory_store()
+            async with span("postgres", "memory_store.get_memories"):
+                memories = await store.get_memories(
+                    agent_id=agent_id,
+                    user_id=user_id,
+                    type=type,
+                    tags=parsed_tags,
+                    limit=limit
+                )
+
+        memories = [project_memory(m, fields) for m in memories]
+        return FastJSONResponse({"status": "ok", "memories": memories})
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -1,7 +1,6 @@
 # modal_api/routes/reload.py
 
 from fastapi import APIRouter, Request
-from kairoswarm_core.agent_updater.update_assistants import reload_agent
 
 router = APIRouter()
 
@@ -15,6 +14,7 @@ async def reload_agent_endpoint(request: Request):
         return {"status": "error", "message": "Missing agent_id"}
 
     try:
+        from kairoswarm_core.agent_updater.update_assistants import reload_agent
         result = await reload_agent(sid, agent_id)
         return {"status": "ok", "result": result}
     except Exception as e:
@@ -1,21 +1,21 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi import Body
-import openai
 import uuid
 import json
-import os
 from datetime import datetime
-from openai import AsyncOpenAI
-from modal_api.utils.services import get_redis
-
-from kairoswarm_core.memory_core.memory_store import MemoryStore
-
-router = APIRouter()
-
-# --- OpenAI Init ---
-openai.api_key = os.environ["OPENAI_API_KEY"]
-client = AsyncOpenAI(api_key=openai.api_key)
+from modal_api.utils.services import get_redis, get_openai, get_async_openai
+from modal_api.utils import thread_pool
+from modal_api.utils.fanout import fan_out
+from modal_api.utils.metrics import span
+from modal_api.utils.responses import FastJSONResponse, json_array_response
+from modal_api.utils.serialization import decode_record, encode_record, is_record
+from modal_api.utils.run_executor import execute_run
+from modal_api.utils.tape_stream import DeltaPublisher, sse_events
+from modal_api.utils.tape import (
+    TAPE_HOT_WINDOW, TAPE_ARCHIVE_BATCH,
+    append_tape_entry, archive_enabled, clear_tape, read_hot_window, read_tape_page, schedule_archive,
+)
 
 router = APIRouter()
 
@@ -30,34 +30,36 @@ async def add_agent(request: Request):
         return {"status": "skipped", "reason": "No agent ID provided"}
 
     try:
-        assistant = openai.beta.assistants.retrieve(agent_id)
-        thread = openai.beta.threads.create()
+        openai = get_openai()
+        with span("openai", "assistants.retrieve"):
+            assistant = openai.beta.assistants.retrieve(agent_id)
         pid = str(uuid.uuid4())
 
         async with get_redis() as r:
+            thread_id = await thread_pool.acquire_thread(r)
             await r.hset(f"{sid}:agents", assistant.id, json.dumps({
                 "agent_id": assistant.id,
-                "thread_id": thread.id,
+                "thread_id": thread_id,
                 "name": assistant.name
             }))
             await r.hset(f"{sid}:agent:{assistant.id}", mapping={
                 "agent_id": assistant.id,
-                "thread_id": thread.id,
+                "thread_id": thread_id,
                 "name": assistant.name
             })
-            await r.hset(f"{sid}:participants", pid, json.dumps({
+            await r.hset(f"{sid}:participants", pid, encode_record({
                 "id": pid,
                 "name": assistant.name,
                 "type": "agent",
                 "metadata": {
                     "agent_id": assistant.id,
-                    "thread_id": thread.id
+                    "thread_id": thread_id
                 }
             }))
 
         return {
             "name": assistant.name,
-            "thread_id": thread.id
+            "thread_id": thread_id
         }
 
     except Exception as e:
@@ -69,125 +71,159 @@ async def get_agents():
     pass  # Ephemeral only — agents stored in memory
 
 
-# @router.post("/speak")
-# async def speak(request: Request):
-#     body = await request.json()
-#     pid = body.get("participant_id")
-#     message = body.get("message")
-#     sid = body.get("swarm_id") or "default"
-
-#     if not pid or not message:
-#         return {"status": "skipped", "reason": "Missing participant_id or message"}
-
-#     async with get_redis() as r:
-#         part_raw = await r.hget(f"{sid}:participants", pid)
-#         if not part_raw:
-#             return {"error": "Participant not found."}
-
-#         part = json.loads(part_raw)
-#         entry = {"from": part["name"], "type": part["type"], "message": message}
-#         await r.rpush(f"{sid}:conversation_tape", json.dumps(entry))
-
-#         if part["type"] == "human":
-#             agent_ids = await r.hkeys(f"{sid}:agents")
-#             for aid in agent_ids:
-#                 agent_json = await r.hget(f"{sid}:agents", aid)
-#                 if not agent_json:
-#                     continue
-#                 agent_data = json.loads(agent_json)
-
-#                 thread_id = agent_data["thread_id"]
-#                 assistant_id = agent_data["agent_id"]
-
-#                 user_name = part.get("name", "User")
-#                 message_with_name = f"{user_name}: {message}"
-
-#                 await client.beta.threads.messages.create(
-#                     thread_id=thread_id,
-#                     role="user",
-#                     content=message_with_name
-#                 )
-
-#                 run = await client.beta.threads.runs.create_and_poll(
-#                     thread_id=thread_id,
-#                     assistant_id=assistant_id
-#                 )
-#                 messages = (await client.beta.threads.messages.list(thread_id=thread_id)).data
-#                 reply = next(
-#                     (m for m in reversed(messages)
-#                      if m.role == "assistant" and m.run_id == run.id),
-#                     None
-#                 )
-#                 if reply:
-#                     response_text = reply.content[0].text.value.strip()
-#                     agent_entry = {
-#                         "from": agent_data.get("name", "Agent"),
-#                         "type": "agent",
-#                         "message": response_text
-#                     }
-#                     await r.rpush(f"{sid}:conversation_tape", json.dumps(agent_entry))
-#             return {"status": "ok", "entry": entry}
-
-#         # Agent initiator flow
-#         agent_data = await r.hgetall(f"{sid}:agent:{pid}")
-#         if not agent_data:
-#             return {"status": "ok", "entry": entry}
-
-#         thread_id = agent_data["thread_id"]
-#         assistant_id = agent_data["agent_id"]
-
-#         user_name = part.get("name", "User")
-#         message_with_name = f"{user_name}: {message}"
-
-#         await client.beta.threads.messages.create(
-#             thread_id=thread_id,
-#             role="user",
-#             content=message_with_name
-#         )
-
-
-#         run = await client.beta.threads.runs.create_and_poll(
-#             thread_id=thread_id,
-#             assistant_id=assistant_id
-#         )
-
-#         messages = (await client.beta.threads.messages.list(thread_id=thread_id)).data
-#         reply = next(
-#             (m for m in reversed(messages)
-#              if m.role == "assistant" and m.run_id == run.id),
-#             None
-#         )
-
-#         if reply:
-#             response_text = reply.content[0].text.value.strip()
-#             agent_entry = {
-#                 "from": part["name"],
-#                 "type": "agent",
-#                 "message": response_text
-#             }
-#             await r.rpush(f"{sid}:conversation_tape", json.dumps(agent_entry))
-#             return {"status": "ok", "entry": agent_entry}
-#         else:
-#             return {"status": "ok", "entry": entry}
-# 
-            
+@router.post("/speak")
+async def speak(request: Request):
+    """
+    Appends a participant's message to the tape. A human message is sent to every
+    agent in the swarm concurrently (see fanout.py); each reply is appended to the
+    tape as soon as it arrives. With "stream": true, agent runs are streamed and their
+    partial text is published to GET /tape/stream while they run.
+    """
+    body = await request.json()
+    pid = body.get("participant_id")
+    message = body.get("message")
+    sid = body.get("swarm_id") or "default"
+    stream = body.get("stream") is True
+
+    if not pid or not message:
+        return {"status": "skipped", "reason": "Missing participant_id or message"}
+
+    async with get_redis(decode_responses=False) as r:
+        part_raw = await r.hget(f"{sid}:participants", pid)
+        if not part_raw:
+            return {"error": "Participant not found."}
+
+        part = decode_record(part_raw)
+        entry = {
+            "from": part["name"],
+            "type": part["type"],
+            "message": message,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        await append_tape_entry(r, sid, entry)
+
+        client = await get_async_openai()
+        message_with_name = f"{part.get('name', 'User')}: {message}"
+
+        if part["type"] == "human":
+            agents = [json.loads(raw) for raw in (await r.hvals(f"{sid}:agents"))]
+
+            async def run_agent(agent):
+                name = agent.get("name", "Agent")
+                assistant_id = agent.get("assistant_id") or agent["agent_id"]
+                publisher = DeltaPublisher(r, sid, str(uuid.uuid4()), name) if stream else None
+                run = await execute_run(client, agent["thread_id"], assistant_id, message_with_name, publisher)
+                if run.text is None:
+                    return None
+
+                agent_entry = {
+                    "from": name,
+                    "type": "agent",
+                    "message": run.text,
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+                await append_tape_entry(r, sid, agent_entry)
+                if publisher:
+                    await publisher.done(agent_entry)
+                return agent_entry
+
+            replies = []
+
+            async def on_reply(agent, agent_entry):
+                if agent_entry is not None:
+                    replies.append(agent_entry)
+
+            outcomes = await fan_out(sid, agents, run_agent, on_reply)
+            return {"status": "ok", "entry": entry, "replies": replies, "agents": outcomes}
+
+        # Agent initiator flow
+        agent_id = part.get("metadata", {}).get("agent_id") or pid
+        agent_data = {
+            k.decode(): v.decode() for k, v in (await r.hgetall(f"{sid}:agent:{agent_id}")).items()
+        }
+        if not agent_data:
+            return {"status": "ok", "entry": entry}
+
+        async def run_initiated(agent):
+            run = await execute_run(
+                client, agent["thread_id"], agent.get("assistant_id") or agent["agent_id"], message_with_name
+            )
+            if run.text is None:
+                return None
+
+            agent_entry = {
+                "from": part["name"],
+                "type": "agent",
+                "message": run.text,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+            await append_tape_entry(r, sid, agent_entry)
+            return agent_entry
+
+        replies = []
+
+        async def on_reply(agent, agent_entry):
+            if agent_entry is not None:
+                replies.append(agent_entry)
+
+        # A fan-out of one: same timeout, run cancellation and error outcome as above
+        outcomes = await fan_out(sid, [agent_data], run_initiated, on_reply)
+        return {"status": "ok", "entry": replies[0] if replies else entry, "agents": outcomes}
+
 
 @router.get("/participants-full")
 async def participants_full(request: Request):
     sid = request.query_params.get("swarm_id") or "default"
-    async with get_redis() as r:
+    async with get_redis(decode_responses=False) as r:
         raw = await r.hvals(f"{sid}:participants")
         try:
-            return [json.loads(x) for x in raw if isinstance(x, str) and x.strip().startswith("{")]
+            return json_array_response([x for x in raw if is_record(x)])
         except Exception as e:
             return JSONResponse(status_code=500, content={"error": f"Malformed data in Redis: {str(e)}"})
 
 @router.get("/tape")
 async def tape(request: Request):
+    """
+    Without paging params: the hot window as a list (X-Tape-First-Seq gives its first seq).
+    With `before` and/or `limit`: a page of older entries, read from the archive as needed.
+    Without POSTGRES_URL there is no archive, and the hot window is the whole, unbounded tape.
+    """
     sid = request.query_params.get("swarm_id") or "default"
-    async with get_redis() as r:
-        raw = await r.lrange(f"{sid}:conversation_tape", 0, -1)
-    return [json.loads(x) for x in raw]
+    before = request.query_params.get("before")
+    limit = request.query_params.get("limit")
+
+    async with get_redis(decode_responses=False) as r:
+        if before is None and limit is None:
+            first_seq, raw, length = await read_hot_window(r, sid)
+            if length >= TAPE_HOT_WINDOW + TAPE_ARCHIVE_BATCH and archive_enabled():
+                schedule_archive(get_redis, sid)
+            return json_array_response(raw, headers={"X-Tape-First-Seq": str(first_seq)})
+
+        first_seq, entries = await read_tape_page(
+            r, sid,
+            before=int(before) if before is not None else None,
+            limit=int(limit) if limit is not None else 100,
+        )
+    return FastJSONResponse({"entries": entries, "first_seq": first_seq, "has_more": first_seq > 0})
+
+@router.get("/tape/stream")
+async def tape_stream(request: Request):
+    """Server-sent events with live agent deltas for a swarm (see tape_stream.py)."""
+    sid = request.query_params.get("swarm_id") or "default"
+    r = get_redis()
+
+    async def events():
+        try:
+            async for event in sse_events(r, sid, request.is_disconnected):
+                yield event
+        finally:
+            await r.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.post("/create-ephemeral")
 async def create_ephemeral_swarm(payload: dict = Body(...)):
@@ -204,7 +240,7 @@ async def create_ephemeral_swarm(payload: dict = Body(...)):
                 "message": f"Ephemeral swarm '{name}' created.",
                 "timestamp": datetime.utcnow().isoformat()
             }
-            await r.rpush(tape_key, json.dumps(entry))
+            await append_tape_entry(r, swarm_id, entry)
             await r.expire(tape_key, 86400)  # 24 hours
             await r.expire(f"{swarm_id}:participants", 86400)
             await r.expire(f"{swarm_id}:agents", 86400)
@@ -225,7 +261,7 @@ async def clear_ephemeral(request: Request):
         return {"status": "skipped", "reason": "No valid ephemeral swarm_id provided."}
 
     async with get_redis() as r:
-        await r.delete(f"{sid}:conversation_tape")
+        await clear_tape(r, sid)
         await r.delete(f"{sid}:participants")
         await r.delete(f"{sid}:agents")
         agent_ids = await r.hkeys(f"{sid}:agents")
@@ -239,7 +275,7 @@ async def clear_ephemeral(request: Request):
 async def clear_default():
     sid = "default"
     async with get_redis() as r:
-        await r.delete(f"{sid}:conversation_tape")
+        await clear_tape(r, sid)
         await r.delete(f"{sid}:participants")
         await r.delete(f"{sid}:agents")
         agent_ids = await r.hkeys(f"{sid}:agents")
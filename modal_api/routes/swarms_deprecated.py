@@ -3,14 +3,18 @@ import json
 import uuid
 from datetime import datetime
 
-import openai
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import JSONResponse
 
 from modal_api.routes.auth import get_current_user
-from modal_api.utils.services import get_redis, get_supabase
+from modal_api.utils import agent_cache, agent_search, thread_pool
+from modal_api.utils.services import get_redis, get_supabase, get_async_openai
 from modal_api.utils.services import EmbeddingRequest, generate_embedding
+from modal_api.utils.metrics import span
+from modal_api.utils.responses import FastJSONResponse
+from modal_api.utils.serialization import decode_record, encode_record, is_record
+from modal_api.utils.tape import append_tape_entry
 
 
 router = APIRouter()
@@ -36,12 +40,12 @@ async def create_ephemeral_swarm(payload: CreateEphemeralRequest):
             tape_key = f"{swarm_id}:conversation_tape"
 
             # Create system tape entry
-            await redis.rpush(tape_key, json.dumps({
+            await append_tape_entry(redis, swarm_id, {
                 "from": "system",
                 "type": "system",
                 "message": f"Swarm '{payload.name}' created.",
                 "timestamp": now
-            }))
+            })
             await redis.expire(tape_key, ttl_seconds)
 
             # Initialize participants and agents keys with TTL
@@ -67,7 +71,7 @@ async def join_ephemeral_swarm(request: Request):
     user_id = body.get("user_id")  # may be None
     now = datetime.utcnow().isoformat()
 
-    async with get_redis() as r:
+    async with get_redis(decode_responses=False) as r:
         # Ensure swarm exists
         ttl = await r.ttl(f"{swarm_id}:conversation_tape")
         if ttl <= 0 and ttl != -1:
@@ -78,7 +82,9 @@ async def join_ephemeral_swarm(request: Request):
         if user_id:
             existing = await r.hvals(participant_key)
             for item in existing:
-                p = json.loads(item)
+                if not is_record(item):
+                    continue
+                p = decode_record(item)
                 if p.get("user_id") == user_id:
                     # Refresh TTL and return existing participant
                     pid = p["id"]
@@ -98,7 +104,7 @@ async def join_ephemeral_swarm(request: Request):
         if user_id:
             record["user_id"] = user_id
 
-        await r.hset(participant_key, participant_id, json.dumps(record))
+        await r.hset(participant_key, participant_id, encode_record(record))
         await r.hset(f"{swarm_id}:participant:{participant_id}", mapping=record)
         if ttl > 0:
             await r.expire(participant_key, ttl)
@@ -120,25 +126,24 @@ async def add_agent(request: Request):
         if not agent_id:
             return {"status": "skipped", "reason": "No agent ID provided"}
 
-        sb = get_supabase()
         redis = await get_redis()
 
-        # 🔍 Look up agent in Supabase by Kairoswarm UUID
-        agent_resp = sb.table("agents").select("name", "openai_id", "system_prompt", "voice").eq("id", agent_id).single().execute()
+        # 🔍 Look up agent by Kairoswarm UUID (cached, Supabase on a miss)
+        agent = await agent_cache.get_agent(redis, agent_id)
 
-        if not agent_resp.data:
+        if not agent:
             return JSONResponse(status_code=404, content={"error": f"Agent {agent_id} not found."})
 
-        openai_id = agent_resp.data["openai_id"]
-        name = agent_resp.data["name"]
-        voice = agent_resp.data.get("voice")
-        system_prompt = agent_resp.data.get("system_prompt")
+        openai_id = agent["openai_id"]
+        name = agent["name"]
+        voice = agent.get("voice")
+        system_prompt = agent.get("system_prompt")
 
         if not openai_id:
             return JSONResponse(status_code=400, content={"error": "Agent does not have an OpenAI assistant ID."})
 
-        # ✅ Create new OpenAI thread
-        thread = openai.beta.threads.create()
+        # ✅ Take a fresh OpenAI thread from the pool
+        thread_id = await thread_pool.acquire_thread(redis)
         pid = str(uuid.uuid4())
 
         ttl = await redis.ttl(f"{sid}:conversation_tape")
@@ -149,7 +154,7 @@ async def add_agent(request: Request):
         agent_blob = {
             "agent_id": agent_id,
             "assistant_id": openai_id,
-            "thread_id": thread.id,
+            "thread_id": thread_id,
             "name": name,
             "voice": voice,
             "system_prompt": system_prompt,
@@ -158,13 +163,13 @@ async def add_agent(request: Request):
         await redis.hset(f"{sid}:agents", agent_id, json.dumps(agent_blob))
         await redis.hset(f"{sid}:agent:{agent_id}", mapping=agent_blob)
 
-        await redis.hset(f"{sid}:participants", pid, json.dumps({
+        await redis.hset(f"{sid}:participants", pid, encode_record({
             "id": pid,
             "name": name,
             "type": "agent",
             "metadata": {
                 "agent_id": agent_id,
-                "thread_id": thread.id
+                "thread_id": thread_id
             }
         }))
 
@@ -173,7 +178,7 @@ async def add_agent(request: Request):
             await redis.expire(f"{sid}:agent:{agent_id}", ttl)
             await redis.expire(f"{sid}:participants", ttl)
 
-        return {"name": name, "thread_id": thread.id}
+        return {"name": name, "thread_id": thread_id}
 
     except Exception as e:
         logging.exception("❌ Failed to add agent to swarm")
@@ -191,26 +196,28 @@ async def reload_agent(request: Request):
         return {"status": "error", "message": "Missing agent_id"}
 
     try:
-        sb = get_supabase()
-        agent_resp = sb.table("agents").select("name", "openai_id", "system_prompt", "voice").eq("id", agent_id).single().execute()
+        # Reload means "pick up the agent's current row": drop cached copies first
+        async with get_redis() as rc:
+            await agent_cache.invalidate(rc, agent_id)
+            agent = await agent_cache.get_agent(rc, agent_id)
 
-        if not agent_resp.data:
-            return {"status": "error", "message": "Agent not found in Supabase."}
+            if not agent:
+                return {"status": "error", "message": "Agent not found in Supabase."}
 
-        name = agent_resp.data["name"]
-        voice = agent_resp.data.get("voice")
-        system_prompt = agent_resp.data.get("system_prompt")
-        openai_id = agent_resp.data["openai_id"]
+            thread_id = await thread_pool.acquire_thread(rc)
 
-        thread = openai.beta.threads.create()
+        name = agent["name"]
+        voice = agent.get("voice")
+        system_prompt = agent.get("system_prompt")
+        openai_id = agent["openai_id"]
 
-        async with get_redis() as r:
+        async with get_redis(decode_responses=False) as r:
             # 🔍 Look for existing participant with this agent_id
             participants_raw = await r.hvals(f"{swarm_id}:participants")
             existing_pid = None
             for entry in participants_raw:
                 try:
-                    data = json.loads(entry)
+                    data = decode_record(entry)
                     if (
                         data.get("type") == "agent"
                         and data.get("metadata", {}).get("agent_id") == agent_id
@@ -225,7 +232,7 @@ async def reload_agent(request: Request):
             agent_blob = {
                 "agent_id": agent_id,
                 "assistant_id": openai_id,
-                "thread_id": thread.id,
+                "thread_id": thread_id,
                 "name": name,
                 "voice": voice,
                 "system_prompt": system_prompt,
@@ -234,13 +241,13 @@ async def reload_agent(request: Request):
             await r.hset(f"{swarm_id}:agents", agent_id, json.dumps(agent_blob))
             await r.hset(f"{swarm_id}:agent:{agent_id}", mapping=agent_blob)
 
-            await r.hset(f"{swarm_id}:participants", pid, json.dumps({
+            await r.hset(f"{swarm_id}:participants", pid, encode_record({
                 "id": pid,
                 "name": name,
                 "type": "agent",
                 "metadata": {
                     "agent_id": agent_id,
-                    "thread_id": thread.id
+                    "thread_id": thread_id
                 }
             }))
 
@@ -286,10 +293,12 @@ async def publish_agent(payload: PublishAgentRequest):
         """.strip()
 
         # 🧠 Generate embedding
-        response = openai.embeddings.create(
-            input=text_for_embedding,
-            model="text-embedding-3-small"
-        )
+        client = await get_async_openai()
+        async with span("openai", "embeddings.create"):
+            response = await client.embeddings.create(
+                input=text_for_embedding,
+                model="text-embedding-3-small"
+            )
         embedding = response.data[0].embedding
 
         # 🔄 Update agent record in Supabase
@@ -305,7 +314,10 @@ async def publish_agent(payload: PublishAgentRequest):
             "user_id": payload.user_id
         }
 
-        sb.table("agents").update(update_data).eq("id", agent_id).execute()
+        with span("supabase", "agents.update"):
+            sb.table("agents").update(update_data).eq("id", agent_id).execute()
+        async with get_redis() as r:
+            await agent_cache.invalidate(r, agent_id)
 
         return {"status": "ok", "id": agent_id}
 
@@ -314,6 +326,36 @@ async def publish_agent(payload: PublishAgentRequest):
         raise HTTPException(status_code=500, detail=f"Agent publish failed: {str(e)}")
 
 
+@router.get("/search-agents")
+async def search_agents(request: Request):
+    """
+    Published agents nearest to `query` (see agent_search.py). Filters: max_price,
+    free_tier=1|0, skills (comma-separated, all required); also limit and ef_search.
+    """
+    params = request.query_params
+    query = (params.get("query") or "").strip()
+    if not query:
+        return {"status": "error", "message": "Missing 'query'"}
+    if not agent_search.search_enabled():
+        return {"status": "error", "message": "Agent search needs POSTGRES_URL and AGENT_SEARCH=1"}
+
+    try:
+        async with get_redis() as r:
+            embedding = await agent_search.query_embedding(r, query)
+        agents = await agent_search.search_agents(
+            embedding,
+            limit=int(params.get("limit", 10)),
+            max_price=params.get("max_price"),
+            free_tier=params["free_tier"] == "1" if params.get("free_tier") in ("0", "1") else None,
+            skills=[s.strip() for s in params.get("skills", "").split(",") if s.strip()],
+            ef_search=params.get("ef_search"),
+        )
+        return FastJSONResponse({"status": "ok", "agents": agents})
+    except Exception as e:
+        logging.exception("❌ Agent search failed")
+        return {"status": "error", "message": str(e)}
+
+
 @router.post("/unpublish-agent")
 async def unpublish_agent(request: Request, user=Depends(get_current_user)):
     try:
@@ -326,13 +368,17 @@ async def unpublish_agent(request: Request, user=Depends(get_current_user)):
         supabase = get_supabase()
 
         # Verify agent ownership
-        agent_resp = supabase.table("agents").select("user_id").eq("id", agent_id).single().execute()
+        with span("supabase", "agents.select"):
+            agent_resp = supabase.table("agents").select("user_id").eq("id", agent_id).single().execute()
 
         if not agent_resp.data or agent_resp.data["user_id"] != user["id"]:
             raise HTTPException(status_code=403, detail="You do not have permission to unpublish this agent.")
 
         # Perform soft delete
-        supabase.table("agents").update({"is_published": False}).eq("id", agent_id).execute()
+        with span("supabase", "agents.update"):
+            supabase.table("agents").update({"is_published": False}).eq("id", agent_id).execute()
+        async with get_redis() as r:
+            await agent_cache.invalidate(r, agent_id)
 
         return {"status": "success", "message": "Agent unpublished successfully."}
 
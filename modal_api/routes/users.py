@@ -1,11 +1,12 @@
 # modal_api/routes/users.py
 
 from fastapi import APIRouter, Request
-import asyncpg, os
 from datetime import datetime
 
+from modal_api.utils.metrics import span
+from modal_api.utils.services import get_pg_pool
+
 router = APIRouter()
-DB_URL = os.getenv("POSTGRES_URL")
 
 @router.post("/register-user")
 async def register_user(request: Request):
@@ -16,18 +17,20 @@ async def register_user(request: Request):
         return {"status": "error", "message": "Email is required"}
 
     try:
-        pool = await asyncpg.create_pool(dsn=DB_URL)
+        pool = await get_pg_pool()
         async with pool.acquire() as conn:
-            result = await conn.fetchrow("""
-                INSERT INTO users (email)
-                VALUES ($1)
-                ON CONFLICT (email) DO NOTHING
-                RETURNING id
-            """, email)
+            async with span("postgres", "users.insert"):
+                result = await conn.fetchrow("""
+                    INSERT INTO users (email)
+                    VALUES ($1)
+                    ON CONFLICT (email) DO NOTHING
+                    RETURNING id
+                """, email)
             if result:
                 return {"status": "ok", "user_id": str(result["id"])}
             else:
-                existing = await conn.fetchrow("SELECT id FROM users WHERE email = $1", email)
+                async with span("postgres", "users.select"):
+                    existing = await conn.fetchrow("SELECT id FROM users WHERE email = $1", email)
                 return {"status": "ok", "user_id": str(existing["id"])}
     except Exception as e:
         return {"status": "error", "message": str(e)}
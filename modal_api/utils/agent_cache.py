@@ -0,0 +1,83 @@
+# modal_api/utils/agent_cache.py
+#
+# Read-through cache for agent records from the Supabase `agents` table.
+#
+# Two tiers: a small in-process LRU per container, and Redis under versioned keys
+# (`agentcfg:{id}:{version}`). publish/unpublish/reload call invalidate(), which INCRs
+# `agentcfg:{id}:version`, so every container stops using its copy on its next lookup
+# and a concurrent reader that loaded stale data can only write it under the old,
+# orphaned version. A lookup costs one Redis GET on an in-process hit, two on a Redis
+# hit, and creates a Supabase client and queries it only on a miss.
+
+import json
+import os
+import time
+from collections import OrderedDict
+
+from modal_api.utils.metrics import counter, span
+from modal_api.utils.services import get_supabase
+
+AGENT_FIELDS = ("name", "openai_id", "system_prompt", "voice")
+
+CACHE_TTL = int(os.getenv("AGENT_CACHE_TTL", "3600"))
+LOCAL_SIZE = int(os.getenv("AGENT_CACHE_LOCAL_SIZE", "1024"))
+LOCAL_TTL = float(os.getenv("AGENT_CACHE_LOCAL_TTL", "300"))
+
+AGENT_CACHE_LOOKUPS = counter(
+    "kairoswarm_agent_cache_lookups_total",
+    "Agent record lookups by where they were served from (local, redis, supabase).",
+    ("outcome",),
+)
+
+# agent_id -> (version, record, loaded_at)
+_local = OrderedDict()
+
+
+def version_key(agent_id):
+    return f"agentcfg:{agent_id}:version"
+
+
+def _remember(agent_id, version, record):
+    _local[agent_id] = (version, record, time.monotonic())
+    _local.move_to_end(agent_id)
+    while len(_local) > LOCAL_SIZE:
+        _local.popitem(last=False)
+
+
+async def get_agent(r, agent_id):
+    """The agent's AGENT_FIELDS as a dict, or None if there is no such agent. `r` must decode responses."""
+    version = await r.get(version_key(agent_id)) or "0"
+
+    cached = _local.get(agent_id)
+    if cached and cached[0] == version and time.monotonic() - cached[2] < LOCAL_TTL:
+        _local.move_to_end(agent_id)
+        AGENT_CACHE_LOOKUPS.inc(outcome="local")
+        return cached[1]
+
+    key = f"agentcfg:{agent_id}:{version}"
+    raw = await r.get(key)
+    if raw is not None:
+        record = json.loads(raw)
+        _remember(agent_id, version, record)
+        AGENT_CACHE_LOOKUPS.inc(outcome="redis")
+        return record
+
+    AGENT_CACHE_LOOKUPS.inc(outcome="supabase")
+    with span("supabase", "agents.select"):
+        response = get_supabase().table("agents").select(*AGENT_FIELDS).eq("id", agent_id).maybe_single().execute()
+    record = response.data if response else None
+    if not record:
+        return None
+
+    await r.set(key, json.dumps(record), ex=CACHE_TTL)
+    _remember(agent_id, version, record)
+    return record
+
+
+async def invalidate(r, agent_id):
+    """Call after changing the agent's row: drops this container's copy and bumps the version for all."""
+    _local.pop(agent_id, None)
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.incr(version_key(agent_id))
+        pipe.expire(version_key(agent_id), CACHE_TTL * 2)
+        await pipe.execute()
@@ -0,0 +1,119 @@
+# modal_api/utils/agent_search.py
+#
+# Marketplace discovery: nearest published agents to a query, over the
+# `vector_embedding` that /publish-agent stores on the Supabase `agents` table.
+#
+# Queries go straight to Postgres (POSTGRES_URL must point at the Supabase database),
+# opt-in with AGENT_SEARCH=1 like memory_db's MEMORY_ANN=1: nothing here has yet run
+# against the live schema, which must store `vector_embedding` as a pgvector column.
+# A partial HNSW index covers published agents only, so the index stays as small as the
+# catalog; price / free-tier / skill filters are applied in the same query, with
+# hnsw.iterative_scan (MEMORY_HNSW_ITERATIVE_SCAN) keeping results full under selective
+# filters. Query embeddings are cached in Redis by normalized query text, so repeated
+# searches cost no embedding call.
+
+import array
+import base64
+import hashlib
+import os
+
+from modal_api.utils.memory_ingest import embed_texts
+from modal_api.utils.metrics import counter, span
+from modal_api.utils.pgvector_utils import (
+    HNSW_EF_CONSTRUCTION, HNSW_M, add_param, clamp_ef_search, set_search_options, vector_literal,
+)
+from modal_api.utils.services import get_pg_pool
+
+AGENTS_TABLE = os.getenv("AGENTS_TABLE", "agents")
+EMBEDDING_CACHE_TTL = int(os.getenv("AGENT_SEARCH_EMBEDDING_TTL", str(86400)))
+MAX_LIMIT = 100
+
+AGENT_COLUMNS = ("id", "name", "description", "skills", "has_free_tier", "price", "is_negotiable", "user_id")
+
+QUERY_EMBEDDINGS = counter(
+    "kairoswarm_agent_search_query_embeddings_total",
+    "Agent search query embeddings by source (cache, openai).",
+    ("source",),
+)
+
+_indexed_tables = set()
+
+
+def search_enabled():
+    # Opt-in until the agents table is confirmed to hold a pgvector `vector_embedding`
+    return bool(os.getenv("POSTGRES_URL")) and os.getenv("AGENT_SEARCH") == "1"
+
+
+async def ensure_agent_indexes(pool=None, table=AGENTS_TABLE):
+    """Partial HNSW index over published agents, and a GIN index for skill filters."""
+    if table in _indexed_tables:
+        return
+    pool = pool or await get_pg_pool()
+    async with span("postgres", "agents.create_index"):
+        await pool.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_published_embedding_hnsw ON {table} "
+            f"USING hnsw (vector_embedding vector_cosine_ops) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}) "
+            f"WHERE is_published"
+        )
+        await pool.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_skills_gin ON {table} USING gin (skills)"
+        )
+    _indexed_tables.add(table)
+
+
+async def query_embedding(r, query):
+    """Embedding of `query`, from the Redis cache when the same (normalized) query was seen recently."""
+    normalized = " ".join(query.lower().split())
+    key = "agentsearch:embedding:" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+    packed = await r.get(key)
+    if packed is not None:
+        QUERY_EMBEDDINGS.inc(source="cache")
+        vector = array.array("f")
+        vector.frombytes(base64.b64decode(packed))
+        return list(vector)
+
+    QUERY_EMBEDDINGS.inc(source="openai")
+    embedding = (await embed_texts([normalized]))[0]
+    await r.set(key, base64.b64encode(array.array("f", embedding).tobytes()), ex=EMBEDDING_CACHE_TTL)
+    return embedding
+
+
+async def search_agents(
+    embedding, limit=10, max_price=None, free_tier=None, skills=None,
+    ef_search=None, exact=False, pool=None, table=AGENTS_TABLE,
+):
+    """
+    Published agents nearest to `embedding`, optionally priced at most `max_price`,
+    with(out) a free tier, and having all of `skills`. Rows carry a `similarity`.
+    """
+    pool = pool or await get_pg_pool()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    args = []
+    vector = add_param(args, vector_literal(embedding))
+    where = ["is_published", "vector_embedding IS NOT NULL"]
+    if max_price is not None:
+        where.append(f"price <= {add_param(args, float(max_price))}")
+    if free_tier is not None:
+        where.append(f"has_free_tier = {add_param(args, bool(free_tier))}")
+    if skills:
+        where.append(f"skills @> {add_param(args, list(skills))}::text[]")
+    sql = (
+        f"SELECT {', '.join(AGENT_COLUMNS)}, 1 - (vector_embedding <=> {vector}::vector) AS similarity "
+        f"FROM {table} WHERE {' AND '.join(where)} "
+        f"ORDER BY vector_embedding <=> {vector}::vector LIMIT {add_param(args, limit)}"
+    )
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await set_search_options(conn, clamp_ef_search(ef_search, limit), exact)
+            async with span("postgres", "agents.search_exact" if exact else "agents.search_ann"):
+                rows = await conn.fetch(sql, *args)
+    return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    # One-off index build: python -m modal_api.utils.agent_search
+    import asyncio
+
+    asyncio.run(ensure_agent_indexes())
+    print(f"✅ Indexes ready on {AGENTS_TABLE}")
@@ -0,0 +1,65 @@
+# modal_api/utils/fanout.py
+#
+# Concurrent fan-out of one message to many agents. Each agent runs as its own task,
+# limited per swarm by a semaphore and bounded by a timeout; results are handed to a
+# callback in completion order, so the fastest agent's reply lands on the tape first.
+
+import asyncio
+import logging
+import os
+import time
+import weakref
+
+FANOUT_CONCURRENCY = int(os.getenv("SWARM_FANOUT_CONCURRENCY", "8"))
+AGENT_TIMEOUT_S = float(os.getenv("SWARM_AGENT_TIMEOUT_S", "90"))
+
+# One semaphore per swarm, shared by concurrent requests on this container; dropped
+# once no fan-out holds it
+_swarm_limits = weakref.WeakValueDictionary()
+
+
+def swarm_limit(sid, concurrency=None):
+    limit = _swarm_limits.get(sid)
+    if limit is None:
+        limit = _swarm_limits[sid] = asyncio.Semaphore(concurrency or FANOUT_CONCURRENCY)
+    return limit
+
+
+async def fan_out(sid, agents, run_agent, on_result=None, timeout=None):
+    """
+    Runs `await run_agent(agent)` for every agent concurrently. A run that exceeds
+    `timeout` seconds is cancelled. `await on_result(agent, result)` is called as each
+    run succeeds. If the caller is cancelled (e.g. the client disconnected), so are the
+    runs. Returns one outcome dict per agent, in completion order.
+    """
+    timeout = timeout or AGENT_TIMEOUT_S
+    limit = swarm_limit(sid)
+
+    async def run(agent):
+        started = time.perf_counter()
+        outcome = {"agent": agent.get("name") or agent.get("agent_id")}
+        try:
+            async with limit:
+                result = await asyncio.wait_for(run_agent(agent), timeout)
+            if on_result is not None:
+                await on_result(agent, result)
+            outcome["status"] = "ok" if result is not None else "empty"
+        except asyncio.TimeoutError:
+            logging.warning("⏱️ Agent %s timed out after %.0fs in swarm %s", outcome["agent"], timeout, sid)
+            outcome["status"] = "timeout"
+        except Exception as e:
+            logging.exception("❌ Agent %s failed in swarm %s", outcome["agent"], sid)
+            outcome["status"] = "error"
+            outcome["error"] = str(e)
+        outcome["seconds"] = round(time.perf_counter() - started, 3)
+        return outcome
+
+    tasks = [asyncio.create_task(run(agent)) for agent in agents]
+    outcomes = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            outcomes.append(await next_done)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return outcomes
@@ -0,0 +1,103 @@
+# modal_api/utils/memory_cache.py
+#
+# Semantic result cache for /get-memories?query=.
+#
+# Results are cached per (agent_id, user_id, filters) under a version number that
+# store_memories() bumps whenever that agent/user gets new memories, so invalidation is
+# a single INCR. Within a scope the newest MEMORY_CACHE_ENTRIES queries are kept, each
+# with its normalized float32 embedding; a request hits when its query text matches
+# exactly (no embedding call needed) or its embedding is within MEMORY_CACHE_SIMILARITY
+# (cosine) of a cached one. Entries expire after MEMORY_CACHE_TTL seconds, which also
+# bounds staleness from expiry/compaction, which does not bump versions.
+
+import array
+import base64
+import hashlib
+import json
+import math
+import os
+
+from modal_api.utils.metrics import counter
+from modal_api.utils.responses import dumps
+
+CACHE_TTL = int(os.getenv("MEMORY_CACHE_TTL", "300"))
+CACHE_ENTRIES = int(os.getenv("MEMORY_CACHE_ENTRIES", "16"))
+CACHE_SIMILARITY = float(os.getenv("MEMORY_CACHE_SIMILARITY", "0.97"))
+
+CACHE_LOOKUPS = counter(
+    "kairoswarm_memory_cache_lookups_total",
+    "Semantic memory cache lookups by outcome (exact, similar, miss).",
+    ("outcome",),
+)
+
+
+def cache_enabled():
+    return os.getenv("MEMORY_CACHE", "1") != "0"
+
+
+def version_key(agent_id, user_id):
+    return f"memcache:{agent_id}:{user_id}:version"
+
+
+def filters_digest(filters):
+    return hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _pack(embedding):
+    norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+    return base64.b64encode(array.array("f", (x / norm for x in embedding)).tobytes()).decode("ascii")
+
+
+def _unpack(packed):
+    vector = array.array("f")
+    vector.frombytes(base64.b64decode(packed))
+    return vector
+
+
+class CachedScope:
+    """Cached queries of one (agent, user, filters) scope at the version read by load()."""
+
+    def __init__(self, key, entries):
+        self.key = key
+        self.entries = entries
+
+    def find(self, query, embedding=None):
+        """Cached memories for `query`, or None. Pass `embedding` for the similarity check."""
+        for entry in self.entries:
+            if entry["query"] == query:
+                CACHE_LOOKUPS.inc(outcome="exact")
+                return entry["memories"]
+        if embedding is None:
+            return None
+
+        norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+        best, best_score = None, CACHE_SIMILARITY
+        for entry in self.entries:
+            score = sum(a * b for a, b in zip(_unpack(entry["embedding"]), embedding)) / norm
+            if score >= best_score:
+                best, best_score = entry, score
+        CACHE_LOOKUPS.inc(outcome="similar" if best else "miss")
+        return best["memories"] if best else None
+
+    async def store(self, r, query, embedding, memories):
+        entry = {"query": query, "embedding": _pack(embedding), "memories": memories}
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.lpush(self.key, dumps(entry))
+            pipe.ltrim(self.key, 0, CACHE_ENTRIES - 1)
+            pipe.expire(self.key, CACHE_TTL)
+            await pipe.execute()
+
+
+async def load(r, agent_id, user_id, filters):
+    version = await r.get(version_key(agent_id, user_id)) or 0
+    key = f"memcache:{agent_id}:{user_id}:{version}:{filters_digest(filters)}"
+    return CachedScope(key, [json.loads(raw) for raw in await r.lrange(key, 0, -1)])
+
+
+async def invalidate(r, owners):
+    """Bumps the version of each (agent_id, user_id), orphaning their cached results."""
+    async with r.pipeline(transaction=False) as pipe:
+        for agent_id, user_id in owners:
+            pipe.incr(version_key(agent_id, user_id))
+            pipe.expire(version_key(agent_id, user_id), 7 * 86400)
+        await pipe.execute()
@@ -0,0 +1,176 @@
+# modal_api/utils/memory_db.py
+#
+# Direct pgvector queries against the agent memory table written by kairoswarm_core's
+# MemoryStore, for reads the store does not offer (ANN knobs, server-side filters,
+# hybrid ranking).
+#
+# The memory table is HNSW-indexed on `embedding` (cosine). Search runs in a
+# transaction so `SET LOCAL hnsw.ef_search` only applies to that query: higher values
+# trade latency for recall. `exact=True` disables index scans, for recall checks.
+
+import os
+
+from modal_api.utils.metrics import span
+from modal_api.utils.pgvector_utils import (
+    HNSW_EF_CONSTRUCTION, HNSW_M, add_param, clamp_ef_search, set_search_options, vector_literal,
+)
+from modal_api.utils.services import get_pg_pool
+
+MEMORY_TABLE = os.getenv("MEMORY_TABLE", "memories")
+
+# Hybrid ranking (ranked_memories): score weights, recency half-life, candidate pool size
+RANK_WEIGHTS = {
+    "similarity": float(os.getenv("MEMORY_RANK_W_SIMILARITY", "0.6")),
+    "relevance": float(os.getenv("MEMORY_RANK_W_RELEVANCE", "0.25")),
+    "recency": float(os.getenv("MEMORY_RANK_W_RECENCY", "0.15")),
+}
+RANK_HALF_LIFE_HOURS = float(os.getenv("MEMORY_RANK_HALF_LIFE_HOURS", "168"))
+RANK_CANDIDATES_PER_RESULT = int(os.getenv("MEMORY_RANK_CANDIDATES", "10"))
+
+# Mirrors the MemoryStore schema, minus the vector
+MEMORY_COLUMNS = ("id", "agent_id", "user_id", "type", "content", "tags", "relevance", "expires_at", "created_at")
+
+_indexed_tables = set()
+
+
+def ann_enabled():
+    # Opt-in until the MemoryStore schema is confirmed to match MEMORY_TABLE / MEMORY_COLUMNS
+    return bool(os.getenv("POSTGRES_URL")) and os.getenv("MEMORY_ANN") == "1"
+
+
+def _columns(fields):
+    if fields == "*":
+        return "*"
+    columns = MEMORY_COLUMNS if fields is None else [c for c in MEMORY_COLUMNS if c in fields] or ["id"]
+    return ", ".join(columns)
+
+
+async def ensure_memory_indexes(pool=None, table=MEMORY_TABLE):
+    """Builds the HNSW and filter indexes once per process (CONCURRENTLY: no write lock)."""
+    if table in _indexed_tables:
+        return
+    pool = pool or await get_pg_pool()
+    async with span("postgres", "memory.create_index"):
+        await pool.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_embedding_hnsw ON {table} "
+            f"USING hnsw (embedding vector_cosine_ops) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        )
+        await pool.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_owner_idx ON {table} (agent_id, user_id)"
+        )
+    _indexed_tables.add(table)
+
+
+def _filters(args, agent_id, user_id, type=None, tags=None, live_only=False):
+    where = [f"agent_id = {add_param(args, agent_id)}", f"user_id = {add_param(args, user_id)}"]
+    if type:
+        where.append(f"type = {add_param(args, type)}")
+    if tags:
+        where.append(f"tags && {add_param(args, list(tags))}::text[]")
+    if live_only:
+        where.append("(expires_at IS NULL OR expires_at > now())")
+    return " AND ".join(where)
+
+
+async def search_memories(
+    agent_id, user_id, embedding, limit=10, type=None, tags=None,
+    ef_search=None, exact=False, fields=None, pool=None, table=MEMORY_TABLE,
+):
+    """
+    Nearest memories by cosine distance, filtered by owner and optionally type / any
+    of `tags`. Rows carry a `similarity` in [-1, 1].
+    """
+    pool = pool or await get_pg_pool()
+    args = []
+    vector = add_param(args, vector_literal(embedding))
+    where = _filters(args, agent_id, user_id, type, tags)
+    sql = (
+        f"SELECT {_columns(fields)}, 1 - (embedding <=> {vector}::vector) AS similarity FROM {table} "
+        f"WHERE {where} ORDER BY embedding <=> {vector}::vector LIMIT {add_param(args, limit)}"
+    )
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await set_search_options(conn, clamp_ef_search(ef_search, limit), exact)
+            async with span("postgres", "memory.search_exact" if exact else "memory.search_ann"):
+                rows = await conn.fetch(sql, *args)
+    return [dict(row) for row in rows]
+
+
+async def ranked_memories(
+    agent_id, user_id, embedding=None, limit=10, type=None, tags=None,
+    weights=None, half_life_hours=None, ef_search=None, fields=None, pool=None, table=MEMORY_TABLE,
+):
+    """
+    Hybrid retrieval in one round-trip. Live (unexpired) memories matching the owner,
+    type and tag filters are narrowed to the nearest RANK_CANDIDATES_PER_RESULT * limit
+    (or the newest, without an embedding), then ranked by
+
+        w_similarity * similarity + w_relevance * relevance + w_recency * 0.5 ** (age / half_life)
+
+    Rows carry `similarity` (null without an embedding) and `score`.
+    """
+    pool = pool or await get_pg_pool()
+    w = dict(RANK_WEIGHTS, **(weights or {}))
+    half_life_s = float(half_life_hours or RANK_HALF_LIFE_HOURS) * 3600
+
+    args = []
+    vector = add_param(args, vector_literal(embedding)) if embedding is not None else None
+    where = _filters(args, agent_id, user_id, type, tags, live_only=True)
+    candidates = add_param(args, limit * RANK_CANDIDATES_PER_RESULT)
+    distance = f"embedding <=> {vector}::vector" if vector else "NULL::float8"
+    order = distance if vector else "created_at DESC"
+
+    score = (
+        f"{add_param(args, w['similarity'])}::float8 * coalesce(1 - distance, 0)"
+        f" + {add_param(args, w['relevance'])}::float8 * coalesce(relevance, 0)"
+        f" + {add_param(args, w['recency'])}::float8"
+        f" * coalesce(power(0.5, extract(epoch FROM now() - created_at) / {add_param(args, half_life_s)}::float8), 0)"
+    )
+    sql = (
+        f"WITH candidates AS ("
+        f" SELECT {', '.join(MEMORY_COLUMNS)}, {distance} AS distance FROM {table}"
+        f" WHERE {where} ORDER BY {order} LIMIT {candidates}"
+        f"), ranked AS ("
+        f" SELECT *, 1 - distance AS similarity, {score} AS score FROM candidates"
+        f") SELECT {'*' if fields == '*' else _columns(fields) + ', similarity, score'} FROM ranked"
+        f" ORDER BY score DESC LIMIT {add_param(args, limit)}"
+    )
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if vector:
+                await set_search_options(conn, clamp_ef_search(ef_search, limit * RANK_CANDIDATES_PER_RESULT))
+            async with span("postgres", "memory.ranked"):
+                rows = await conn.fetch(sql, *args)
+    return [dict(row) for row in rows]
+
+
+async def insert_memories(rows, pool=None, table=MEMORY_TABLE):
+    """
+    Bulk insert of memory dicts (agent_id, user_id, type, content, embedding, tags,
+    relevance, expires_at) in one pipelined executemany. Returns the row count.
+    """
+    pool = pool or await get_pg_pool()
+    async with span("postgres", "memory.insert_many"):
+        await pool.executemany(
+            f"INSERT INTO {table} (agent_id, user_id, type, content, embedding, tags, relevance, expires_at) "
+            f"VALUES ($1, $2, $3, $4, $5::vector, $6::text[], $7, $8::text::timestamptz)",
+            [
+                (
+                    row["agent_id"], row["user_id"], row["type"], row["content"],
+                    vector_literal(row["embedding"]), row.get("tags"),
+                    float(1.0 if row.get("relevance") is None else row["relevance"]), row.get("expires_at"),
+                )
+                for row in rows
+            ],
+        )
+    return len(rows)
+
+
+if __name__ == "__main__":
+    # One-off index build: python -m modal_api.utils.memory_db
+    import asyncio
+
+    asyncio.run(ensure_memory_indexes())
+    print(f"✅ Indexes ready on {MEMORY_TABLE}")
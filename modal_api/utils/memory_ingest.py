@@ -0,0 +1,244 @@
+# modal_api/utils/memory_ingest.py
+#
+# Memory persistence: embedding + insert, and a write-behind queue for it.
+#
+# `/log-memory?async=1` appends the memory to the `memory:ingest` Redis Stream and
+# returns at once. Workers in the `memory-writers` consumer group read batches, embed
+# them in one call, insert them and XACK. Every entry carries an idempotency key: a key
+# is marked done after its insert, so redelivered or re-submitted entries are skipped.
+#
+# Delivery is at least once, not exactly once. The done-key lives in Redis and the row
+# in Postgres, so a worker that dies between the insert and marking the key done leaves
+# the entry pending, and its redelivery inserts the row again. Closing that gap needs
+# the key stored on the row (a unique column, ON CONFLICT DO NOTHING), which waits on
+# the MemoryStore schema being ours to change.
+#
+# Entries left pending (crashed worker, failed insert) are re-claimed after
+# CLAIM_IDLE_MS; after MAX_DELIVERIES attempts they move to `memory:ingest:dead`.
+#
+# Run a worker: python -m modal_api.utils.memory_ingest [--until-idle]
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+
+from modal_api.utils import memory_cache, memory_db
+from modal_api.utils.metrics import counter, span
+from modal_api.utils.services import get_async_openai, get_memory_store, get_redis
+
+STREAM = "memory:ingest"
+DEAD_STREAM = "memory:ingest:dead"
+GROUP = "memory-writers"
+DONE_PREFIX = "memory:ingest:done:"
+
+STREAM_MAXLEN = int(os.getenv("MEMORY_QUEUE_MAXLEN", "1000000"))
+READ_COUNT = int(os.getenv("MEMORY_QUEUE_BATCH", "64"))
+BLOCK_MS = int(os.getenv("MEMORY_QUEUE_BLOCK_MS", "2000"))
+CLAIM_IDLE_MS = int(os.getenv("MEMORY_QUEUE_CLAIM_IDLE_MS", "60000"))
+MAX_DELIVERIES = int(os.getenv("MEMORY_QUEUE_MAX_DELIVERIES", "5"))
+DONE_TTL = int(os.getenv("MEMORY_QUEUE_DONE_TTL", str(7 * 86400)))
+
+QUEUE_EVENTS = counter(
+    "kairoswarm_memory_queue_events_total",
+    "Write-behind memory queue events by outcome.",
+    ("outcome",),
+)
+
+
+async def embed_texts(texts):
+    client = await get_async_openai()
+    async with span("openai", "embeddings.create"):
+        response = await client.embeddings.create(
+            model="text-embedding-3-small",
+            input=texts
+        )
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+class PartialStoreError(Exception):
+    """Some memories of a batch were stored and some were not; `failed` maps batch index -> error."""
+
+    def __init__(self, failed, stored):
+        self.failed = failed
+        self.stored = stored
+        first = next(iter(failed.values()))
+        super().__init__(f"{len(failed)} of {len(failed) + stored} memories failed to store: {first}")
+
+
+async def store_memories(memories):
+    """
+    Inserts embedded memories and invalidates the cached /get-memories results of their
+    agents. With direct SQL the batch is one atomic executemany; via MemoryStore rows are
+    inserted one at a time (a store may hold a single connection), and if only some fail
+    a PartialStoreError says which, so callers retry just those instead of writing the
+    stored ones twice.
+    """
+    failed = {}
+    if memory_db.ann_enabled():
+        await memory_db.insert_memories(memories)
+    else:
+        store = await get_memory_store()
+        async with span("postgres", "memory_store.log_memory"):
+            for i, memory in enumerate(memories):
+                try:
+                    await store.log_memory(**memory)
+                except Exception as e:
+                    failed[i] = e
+        if len(failed) == len(memories):
+            raise failed[0]
+
+    stored = [m for i, m in enumerate(memories) if i not in failed]
+    try:
+        async with get_redis() as r:
+            await memory_cache.invalidate(r, {(m["agent_id"], m["user_id"]) for m in stored})
+    except Exception:
+        # The rows are stored; failing here would make callers retry the insert
+        logging.exception("⚠️ Memory cache invalidation failed")
+
+    if failed:
+        raise PartialStoreError(failed, len(stored))
+    return len(stored)
+
+
+async def ingest_memories(memories):
+    """Embeds (one call) and stores memory dicts that have no embedding yet. May raise PartialStoreError."""
+    embeddings = await embed_texts([m["content"] for m in memories])
+    return await store_memories([dict(m, embedding=e) for m, e in zip(memories, embeddings)])
+
+
+# --- Write-behind queue ---
+
+async def enqueue_memory(r, memory, idempotency_key=None):
+    """Appends a parsed memory to the stream. Returns (entry id, idempotency key)."""
+    key = idempotency_key or str(uuid.uuid4())
+    entry_id = await r.xadd(
+        STREAM,
+        {"key": key, "memory": json.dumps(memory)},
+        maxlen=STREAM_MAXLEN,
+        approximate=True,
+    )
+    QUEUE_EVENTS.inc(outcome="enqueued")
+    return entry_id, key
+
+
+async def ensure_group(r):
+    try:
+        await r.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def _dead_letter(r, entry_id, fields, reason):
+    await r.xadd(DEAD_STREAM, dict(fields, source_id=entry_id, error=reason[:500]))
+    await r.xack(STREAM, GROUP, entry_id)
+    QUEUE_EVENTS.inc(outcome="dead")
+    logging.error("☠️ Memory entry %s moved to %s: %s", entry_id, DEAD_STREAM, reason)
+
+
+async def _claim_stale(r, consumer):
+    """Takes over entries idle longer than CLAIM_IDLE_MS; dead-letters the exhausted ones."""
+    pending = await r.xpending_range(STREAM, GROUP, min="-", max="+", count=READ_COUNT, idle=CLAIM_IDLE_MS)
+    if not pending:
+        return []
+
+    retry = []
+    for p in pending:
+        if p["times_delivered"] >= MAX_DELIVERIES:
+            entries = await r.xrange(STREAM, p["message_id"], p["message_id"])
+            fields = entries[0][1] if entries else {}
+            await _dead_letter(r, p["message_id"], fields, f"gave up after {p['times_delivered']} deliveries")
+        else:
+            retry.append(p["message_id"])
+    if not retry:
+        return []
+    QUEUE_EVENTS.inc(len(retry), outcome="retried")
+    return await r.xclaim(STREAM, GROUP, consumer, CLAIM_IDLE_MS, retry)
+
+
+async def _process(r, entries):
+    """Stores a batch of (id, fields); falls back to one by one so one bad entry can't block the rest."""
+    entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+    if not entries:
+        return
+
+    done = await r.mget([DONE_PREFIX + f["key"] for _, f in entries])
+    fresh, seen_keys = [], set()
+    for (entry_id, fields), is_done in zip(entries, done):
+        if is_done or fields["key"] in seen_keys:
+            await r.xack(STREAM, GROUP, entry_id)
+            QUEUE_EVENTS.inc(outcome="duplicate")
+            continue
+        seen_keys.add(fields["key"])
+        fresh.append((entry_id, fields))
+    if not fresh:
+        return
+
+    async def commit(batch):
+        async with r.pipeline(transaction=False) as pipe:
+            for entry_id, fields in batch:
+                pipe.set(DONE_PREFIX + fields["key"], "1", ex=DONE_TTL)
+                pipe.xack(STREAM, GROUP, entry_id)
+            await pipe.execute()
+        QUEUE_EVENTS.inc(len(batch), outcome="stored")
+
+    try:
+        await ingest_memories([json.loads(f["memory"]) for _, f in fresh])
+        await commit(fresh)
+        return
+    except PartialStoreError as e:
+        # Mark the stored rows done first, so only the failed ones are written again
+        await commit([entry for i, entry in enumerate(fresh) if i not in e.failed])
+        retry = [fresh[i] for i in sorted(e.failed)]
+        logging.warning("⚠️ %s, retrying them one by one", e)
+    except Exception:
+        retry = fresh
+        logging.exception("⚠️ Memory batch of %d failed, retrying entries one by one", len(fresh))
+
+    for entry_id, fields in retry:
+        try:
+            memory = json.loads(fields["memory"])
+        except ValueError as e:
+            await _dead_letter(r, entry_id, fields, f"malformed memory: {e}")
+            continue
+        try:
+            await ingest_memories([memory])
+            await commit([(entry_id, fields)])
+        except Exception:
+            # Left pending: re-claimed after CLAIM_IDLE_MS, up to MAX_DELIVERIES times
+            logging.exception("❌ Memory entry %s failed", entry_id)
+
+
+async def run_worker(consumer=None, until_idle=False, stop=None):
+    """
+    Drains the stream as `consumer` until `stop` is set, or, with until_idle, until a
+    read comes back empty and nothing is waiting to be re-claimed.
+    """
+    consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+    async with get_redis() as r:
+        await ensure_group(r)
+        logging.info("🧠 Memory writer %s reading %s", consumer, STREAM)
+        while not (stop and stop.is_set()):
+            claimed = await _claim_stale(r, consumer)
+            if claimed:
+                await _process(r, claimed)
+
+            response = await r.xreadgroup(GROUP, consumer, {STREAM: ">"}, count=READ_COUNT, block=BLOCK_MS)
+            entries = response[0][1] if response else []
+            if entries:
+                await _process(r, entries)
+            elif until_idle and not claimed:
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write-behind memory queue worker")
+    parser.add_argument("--consumer", help="consumer name (default: host-pid)")
+    parser.add_argument("--until-idle", action="store_true", help="exit once the stream is drained")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker(args.consumer, until_idle=args.until_idle))
@@ -0,0 +1,169 @@
+# modal_api/utils/memory_maintenance.py
+#
+# Scheduled cleanup of the agent memory table (see memory_db.py):
+#   1. delete expired memories in small batches, so no long lock is held;
+#   2. merge near-duplicates per agent/user: when two memories' embeddings are within
+#      MEMORY_MERGE_DISTANCE (cosine), the newer one absorbs the older one's tags and
+#      relevance and the older one is deleted.
+# Cached /get-memories results of every agent/user that lost rows are invalidated.
+#
+# This deletes and rewrites rows of MEMORY_TABLE, so it is opt-in (MEMORY_MAINTENANCE=1)
+# like the direct reads in memory_db, until the MemoryStore schema is confirmed to match.
+# Run by the `compact_memories` cron in app.py, or by hand (--dry-run needs no opt-in):
+#   python -m modal_api.utils.memory_maintenance [--dry-run]
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from modal_api.utils import memory_cache
+from modal_api.utils.memory_db import MEMORY_TABLE
+from modal_api.utils.metrics import span
+from modal_api.utils.services import get_pg_pool, get_redis
+
+PURGE_BATCH = int(os.getenv("MEMORY_PURGE_BATCH", "1000"))
+MERGE_DISTANCE = float(os.getenv("MEMORY_MERGE_DISTANCE", "0.03"))  # cosine distance, i.e. similarity >= 0.97
+MERGE_MAX_PER_OWNER = int(os.getenv("MEMORY_MERGE_MAX_PER_OWNER", "500"))
+
+
+def maintenance_enabled():
+    return bool(os.getenv("POSTGRES_URL")) and os.getenv("MEMORY_MAINTENANCE") == "1"
+
+
+async def purge_expired(pool, table=MEMORY_TABLE, batch_size=PURGE_BATCH, dry_run=False, changed=None):
+    """Deletes expired rows batch by batch. Returns (rows, bytes) removed; adds their owners to `changed`."""
+    if dry_run:
+        row = await pool.fetchrow(
+            f"SELECT count(*) AS n, coalesce(sum(pg_column_size(t.*)), 0) AS bytes "
+            f"FROM {table} t WHERE expires_at < now()"
+        )
+        return row["n"], row["bytes"]
+
+    rows = size = 0
+    while True:
+        async with span("postgres", "memory.purge_expired"):
+            deleted = await pool.fetch(
+                f"DELETE FROM {table} t WHERE ctid IN ("
+                f" SELECT ctid FROM {table} WHERE expires_at < now() LIMIT $1"
+                f") RETURNING agent_id, user_id, pg_column_size(t.*) AS bytes",
+                batch_size,
+            )
+        rows += len(deleted)
+        size += sum(r["bytes"] for r in deleted)
+        if changed is not None:
+            changed.update((r["agent_id"], r["user_id"]) for r in deleted)
+        if len(deleted) < batch_size:
+            return rows, size
+
+
+async def _duplicate_pairs(conn, table, agent_id, user_id, max_distance, limit):
+    """(keep, drop) pairs: each memory's nearest older neighbor within max_distance."""
+    return await conn.fetch(
+        f"SELECT a.id AS keep_id, b.id AS drop_id, b.bytes FROM {table} a "
+        f"CROSS JOIN LATERAL ("
+        f" SELECT id, pg_column_size(o.*) AS bytes, o.embedding <=> a.embedding AS distance FROM {table} o"
+        f" WHERE o.agent_id = a.agent_id AND o.user_id = a.user_id AND o.id <> a.id"
+        f" AND o.created_at <= a.created_at AND o.type = a.type"
+        f" ORDER BY o.embedding <=> a.embedding LIMIT 1"
+        f") b "
+        f"WHERE a.agent_id = $1 AND a.user_id = $2 AND b.distance <= $3 "
+        f"ORDER BY a.created_at DESC LIMIT $4",
+        agent_id, user_id, max_distance, limit,
+    )
+
+
+async def merge_duplicates(pool, table=MEMORY_TABLE, max_distance=MERGE_DISTANCE, dry_run=False, changed=None):
+    """Merges near-duplicate memories per owner. Returns (rows, bytes) removed; adds merged owners to `changed`."""
+    owners = await pool.fetch(f"SELECT DISTINCT agent_id, user_id FROM {table}")
+    rows = size = 0
+
+    for owner in owners:
+        async with pool.acquire() as conn:
+            async with span("postgres", "memory.find_duplicates"):
+                pairs = await _duplicate_pairs(
+                    conn, table, owner["agent_id"], owner["user_id"], max_distance, MERGE_MAX_PER_OWNER
+                )
+
+            # A row is either kept or dropped once per run, so chains (a~b~c) merge pairwise
+            touched, merges = set(), []
+            for pair in pairs:
+                if pair["keep_id"] in touched or pair["drop_id"] in touched:
+                    continue
+                touched.update((pair["keep_id"], pair["drop_id"]))
+                merges.append(pair)
+            if not merges:
+                continue
+
+            rows += len(merges)
+            size += sum(p["bytes"] for p in merges)
+            if dry_run:
+                continue
+
+            async with conn.transaction():
+                async with span("postgres", "memory.merge_duplicates"):
+                    await conn.executemany(
+                        f"UPDATE {table} k SET"
+                        f" relevance = greatest(k.relevance, d.relevance),"
+                        f" tags = (SELECT array_agg(DISTINCT t) FROM unnest(coalesce(k.tags, '{{}}') || coalesce(d.tags, '{{}}')) t),"
+                        f" expires_at = CASE WHEN k.expires_at IS NULL OR d.expires_at IS NULL THEN NULL"
+                        f"   ELSE greatest(k.expires_at, d.expires_at) END"
+                        f" FROM {table} d WHERE k.id = $1 AND d.id = $2",
+                        [(p["keep_id"], p["drop_id"]) for p in merges],
+                    )
+                    await conn.executemany(
+                        f"DELETE FROM {table} WHERE id = $1",
+                        [(p["drop_id"],) for p in merges],
+                    )
+            if changed is not None:
+                changed.add((owner["agent_id"], owner["user_id"]))
+
+    return rows, size
+
+
+async def run_memory_maintenance(table=MEMORY_TABLE, dry_run=False):
+    """One purge + merge pass. Returns a report of what was (or would be) reclaimed."""
+    if not dry_run and not maintenance_enabled():
+        raise RuntimeError("Memory maintenance writes to the memory table: set MEMORY_MAINTENANCE=1 to enable it")
+
+    start = time.perf_counter()
+    pool = await get_pg_pool()
+    size_before = await pool.fetchval("SELECT pg_total_relation_size($1::regclass)", table)
+
+    changed = set()
+    expired_rows, expired_bytes = await purge_expired(pool, table, dry_run=dry_run, changed=changed)
+    merged_rows, merged_bytes = await merge_duplicates(pool, table, dry_run=dry_run, changed=changed)
+    if changed:
+        try:
+            async with get_redis() as r:
+                await memory_cache.invalidate(r, changed)
+        except Exception:
+            logging.exception("⚠️ Memory cache invalidation failed after maintenance")
+
+    report = {
+        "table": table,
+        "dry_run": dry_run,
+        "expired_rows": expired_rows,
+        "expired_bytes": expired_bytes,
+        "merged_rows": merged_rows,
+        "merged_bytes": merged_bytes,
+        # Dead tuples only return to the OS after VACUUM; this shows what autovacuum has caught up on
+        "relation_bytes_before": size_before,
+        "relation_bytes_after": await pool.fetchval("SELECT pg_total_relation_size($1::regclass)", table),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    logging.info(
+        "🧹 Memory maintenance%s: %d expired (%d B), %d merged (%d B) in %.1fs",
+        " (dry run)" if dry_run else "",
+        expired_rows, expired_bytes, merged_rows, merged_bytes, report["seconds"],
+    )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge expired and merge duplicate agent memories")
+    parser.add_argument("--dry-run", action="store_true", help="report only, change nothing")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(run_memory_maintenance(dry_run=args.dry_run)))
@@ -0,0 +1,258 @@
+# modal_api/utils/metrics.py
+#
+# Minimal in-process Prometheus metrics: per-route request latency, plus per-dependency
+# spans (Redis, OpenAI, Supabase, Stripe, Postgres) labelled with the route that made
+# the call. Metrics are per container; Modal scales containers independently.
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ASGI scope and per-dependency time totals of the request being served
+_current_scope: ContextVar[dict | None] = ContextVar("metrics_scope", default=None)
+_current_timings: ContextVar[dict | None] = ContextVar("metrics_timings", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            for bound, count in zip(self.buckets + (float("inf"),), series[:len(self.buckets)] + [series[-1]]):
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def collect(self):
+        lines = super().collect()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+REGISTRY = []
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    metric = Histogram(name, documentation, labelnames, buckets)
+    REGISTRY.append(metric)
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    metric = Counter(name, documentation, labelnames)
+    REGISTRY.append(metric)
+    return metric
+
+
+def gauge(name, documentation, labelnames=()):
+    metric = Gauge(name, documentation, labelnames)
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_latest():
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_LATENCY = histogram(
+    "kairoswarm_http_request_duration_seconds",
+    "Latency of HTTP requests by route template.",
+    ("method", "route", "status"),
+)
+DEPENDENCY_LATENCY = histogram(
+    "kairoswarm_dependency_duration_seconds",
+    "Latency of downstream calls made while serving a route.",
+    ("dependency", "operation", "route"),
+)
+DEPENDENCY_ERRORS = counter(
+    "kairoswarm_dependency_errors_total",
+    "Downstream calls that raised.",
+    ("dependency", "operation", "route"),
+)
+
+
+def current_route():
+    """Route template of the request being served ('background' outside a request)."""
+    scope = _current_scope.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+
+    # The matched route's own template keeps labels bounded whatever the parameter values.
+    # FastAPI versions that resolve included routers lazily leave the include_router
+    # prefix out of it: recover that (literal) prefix as the part of the request path
+    # before where the route's pattern matches.
+    regex = getattr(route, "path_regex", None)
+    path = scope.get("path", "")
+    if regex is not None and not regex.match(path):
+        for i, char in enumerate(path):
+            if char == "/" and i and regex.match(path[i:]):
+                return path[:i] + template
+    return template
+
+
+def background_task(coro):
+    """
+    Starts `coro` as a task outside the current request's context: its spans are labelled
+    'background' and stay out of that request's Server-Timing header.
+    """
+    return asyncio.create_task(coro, context=contextvars.Context())
+
+
+class span:
+    """
+    Times one downstream call. Works as both a sync and an async context manager:
+
+        with span("supabase", "agents.select"): ...
+        async with span("openai", "embeddings.create"): ...
+    """
+
+    def __init__(self, dependency, operation=""):
+        self.dependency = dependency
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        route = current_route()
+        DEPENDENCY_LATENCY.observe(elapsed, dependency=self.dependency, operation=self.operation, route=route)
+        if exc_type is not None:
+            DEPENDENCY_ERRORS.inc(dependency=self.dependency, operation=self.operation, route=route)
+
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[self.dependency] = timings.get(self.dependency, 0.0) + elapsed
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (so context vars reach the handlers) that records request
+    latency per route and adds a Server-Timing header with per-dependency totals.
+    Dependency totals are only complete for handlers that finish before responding.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        status = 500
+        scope_token = _current_scope.set(scope)
+        timings_token = _current_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings:
+                    header = ", ".join(f"{dep};dur={secs * 1000:.1f}" for dep, secs in timings.items())
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=current_route(),
+                status=status,
+            )
+            _current_timings.reset(timings_token)
+            _current_scope.reset(scope_token)
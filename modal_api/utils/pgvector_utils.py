@@ -0,0 +1,42 @@
+# modal_api/utils/pgvector_utils.py
+#
+# Helpers shared by the direct pgvector queries (memory_db.py, agent_search.py): HNSW
+# build settings, vector literals, positional query parameters and the per-transaction
+# search knobs. Settings keep their MEMORY_HNSW_* names, as memory search set them first.
+
+import os
+
+HNSW_M = int(os.getenv("MEMORY_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("MEMORY_HNSW_EF_CONSTRUCTION", "64"))
+DEFAULT_EF_SEARCH = int(os.getenv("MEMORY_HNSW_EF_SEARCH", "40"))
+MAX_EF_SEARCH = 1000
+# pgvector >= 0.8: keep scanning the graph when filters drop candidates ("relaxed_order")
+ITERATIVE_SCAN = os.getenv("MEMORY_HNSW_ITERATIVE_SCAN")
+if ITERATIVE_SCAN not in (None, "off", "strict_order", "relaxed_order"):
+    raise ValueError(f"Invalid MEMORY_HNSW_ITERATIVE_SCAN: {ITERATIVE_SCAN}")
+
+
+def vector_literal(embedding):
+    """pgvector text input; avoids registering a codec on the pool."""
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+
+def add_param(args, value):
+    """Appends `value` to the query args and returns its placeholder ($1, $2, ...)."""
+    args.append(value)
+    return f"${len(args)}"
+
+
+def clamp_ef_search(ef_search, limit):
+    """hnsw.ef_search for a query: the requested (or default) value, at least `limit`."""
+    return max(limit, min(int(ef_search or DEFAULT_EF_SEARCH), MAX_EF_SEARCH))
+
+
+async def set_search_options(conn, ef_search, exact=False):
+    """Per-transaction HNSW knobs; call inside conn.transaction()."""
+    if exact:
+        await conn.execute("SET LOCAL enable_indexscan = off")
+        return
+    await conn.execute(f"SET LOCAL hnsw.ef_search = {ef_search}")
+    if ITERATIVE_SCAN:
+        await conn.execute(f"SET LOCAL hnsw.iterative_scan = {ITERATIVE_SCAN}")
@@ -0,0 +1,69 @@
+# modal_api/utils/responses.py
+#
+# Response classes for the high-volume read endpoints (/tape, /participants-full,
+# /get-memories). FastJSONResponse serializes with orjson when it is installed;
+# json_array_response sends stored JSON records as-is, once they parse, instead of
+# decoding and re-encoding every entry.
+
+import json
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from modal_api.utils.serialization import decode_record, is_binary_record
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to FastAPI's encoder
+    orjson = None
+
+
+def _default(obj):
+    """orjson fallback for types it does not know (asyncpg Records, Decimals, sets...)."""
+    if hasattr(obj, "items"):
+        return dict(obj.items())
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return jsonable_encoder(obj)
+
+
+def dumps(content):
+    """JSON bytes for `content`, with orjson when available."""
+    if orjson is None:
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps(content)
+
+
+def _is_valid_json(raw):
+    try:
+        orjson.loads(raw) if orjson is not None else json.loads(raw)
+        return True
+    except ValueError:
+        return False
+
+
+def json_array_response(raw_entries, status_code=200, headers=None):
+    """
+    A JSON array of stored records. When every record is valid JSON text it is joined
+    as-is, checked but never re-encoded. Otherwise (binary records, see serialization.py,
+    or a malformed one) every record is decoded, and a malformed record raises.
+    """
+    if any(is_binary_record(raw) or not _is_valid_json(raw) for raw in raw_entries):
+        content = dumps([decode_record(raw) for raw in raw_entries])
+    else:
+        content = b"[" + b",".join(
+            raw if isinstance(raw, bytes) else raw.encode("utf-8") for raw in raw_entries
+        ) + b"]"
+    return Response(content=content, status_code=status_code, headers=headers, media_type="application/json")
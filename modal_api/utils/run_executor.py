@@ -0,0 +1,153 @@
+# modal_api/utils/run_executor.py
+#
+# Runs one assistant turn on a thread and returns the reply.
+#
+# The default "stream" mode starts the run with runs.stream and waits on its events:
+# completion is the thread.run.* terminal event and the reply text comes from the
+# thread.message.completed event, so a turn costs 2 API calls (message + run) and no
+# polling. Only if the stream ends without a completed message is the newest assistant
+# message fetched, with messages.list(order="desc", limit=1, run_id=...).
+#
+# "poll" mode (AGENT_RUN_MODE=poll) is the fallback for accounts without streaming:
+# runs.create, then runs.retrieve with a capped backoff, then the same single-message fetch.
+# Both record API calls, polls and wait time per turn in the metrics.
+
+import asyncio
+import logging
+import os
+import time
+
+from modal_api.utils.metrics import counter, histogram, span
+
+RUN_MODE = os.getenv("AGENT_RUN_MODE", "stream")
+POLL_INITIAL_S = 0.25
+POLL_MAX_S = 2.0
+
+TERMINAL = {"completed", "failed", "cancelled", "expired", "incomplete", "requires_action"}
+TERMINAL_EVENTS = {f"thread.run.{status}" for status in TERMINAL}
+
+RUN_API_CALLS = counter(
+    "kairoswarm_agent_run_api_calls_total",
+    "OpenAI calls made by agent turns, by call.",
+    ("call",),
+)
+RUN_POLLS = counter(
+    "kairoswarm_agent_run_polls_total",
+    "runs.retrieve status polls made by agent turns in poll mode.",
+)
+RUN_WAIT = histogram(
+    "kairoswarm_agent_run_wait_seconds",
+    "Time from starting an agent run to having its reply.",
+    ("mode", "status"),
+)
+
+
+class RunResult:
+    def __init__(self, run_id=None, status=None, text=None, api_calls=0, polls=0, wait_s=0.0):
+        self.run_id = run_id
+        self.status = status
+        self.text = text
+        self.api_calls = api_calls
+        self.polls = polls
+        self.wait_s = wait_s
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _message_text(message):
+    return "".join(c.text.value for c in message.content if c.type == "text").strip() or None
+
+
+async def _call(result, name, coro):
+    result.api_calls += 1
+    RUN_API_CALLS.inc(call=name)
+    async with span("openai", name):
+        return await coro
+
+
+async def _latest_reply(client, result, thread_id):
+    page = await _call(result, "messages.list", client.beta.threads.messages.list(
+        thread_id=thread_id, order="desc", limit=1, run_id=result.run_id,
+    ))
+    message = next((m for m in page.data if m.role == "assistant"), None)
+    return _message_text(message) if message else None
+
+
+async def cancel_run(client, thread_id, run_id):
+    try:
+        await client.beta.threads.runs.cancel(run_id, thread_id=thread_id)
+    except Exception:
+        logging.exception("Failed to cancel run %s", run_id)
+
+
+async def _run_streamed(client, result, thread_id, assistant_id, publisher):
+    RUN_API_CALLS.inc(call="runs.stream")
+    result.api_calls += 1
+    async with span("openai", "runs.stream"):
+        async with client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant_id) as stream:
+            async for event in stream:
+                if event.event == "thread.run.created":
+                    result.run_id = event.data.id
+                elif event.event == "thread.message.delta" and publisher is not None:
+                    for part in event.data.delta.content or []:
+                        if part.type == "text" and part.text and part.text.value:
+                            await publisher.add(part.text.value)
+                elif event.event == "thread.message.completed" and event.data.role == "assistant":
+                    result.text = _message_text(event.data)
+                elif event.event in TERMINAL_EVENTS:
+                    result.status = event.data.status
+
+
+async def _run_polled(client, result, thread_id, assistant_id):
+    run = await _call(result, "runs.create", client.beta.threads.runs.create(
+        thread_id=thread_id, assistant_id=assistant_id,
+    ))
+    result.run_id = run.id
+    delay = POLL_INITIAL_S
+    while run.status not in TERMINAL:
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, POLL_MAX_S)
+        result.polls += 1
+        RUN_POLLS.inc()
+        run = await _call(result, "runs.retrieve", client.beta.threads.runs.retrieve(run.id, thread_id=thread_id))
+    result.status = run.status
+
+
+async def execute_run(client, thread_id, assistant_id, content, publisher=None, mode=None):
+    """
+    Posts `content` to the thread, runs the assistant and returns a RunResult whose
+    `text` is the reply (None if the run produced none). With a tape_stream
+    DeltaPublisher, partial text is published while the run streams. If the caller is
+    cancelled (timeout, client gone) the run is cancelled too.
+    """
+    mode = mode or RUN_MODE
+    result = RunResult()
+    await _call(result, "messages.create", client.beta.threads.messages.create(
+        thread_id=thread_id, role="user", content=content,
+    ))
+
+    started = time.perf_counter()
+    try:
+        if mode == "poll":
+            await _run_polled(client, result, thread_id, assistant_id)
+        else:
+            await _run_streamed(client, result, thread_id, assistant_id, publisher)
+        if result.text is None and result.status == "completed" and result.run_id:
+            result.text = await _latest_reply(client, result, thread_id)
+    except asyncio.CancelledError:
+        if result.run_id:
+            asyncio.create_task(cancel_run(client, thread_id, result.run_id))
+        raise
+    except Exception:
+        # e.g. the stream broke mid-run: don't leave the run going on the thread
+        if result.run_id and result.status not in TERMINAL:
+            await cancel_run(client, thread_id, result.run_id)
+        raise
+    finally:
+        result.wait_s = time.perf_counter() - started
+        RUN_WAIT.observe(result.wait_s, mode=mode, status=result.status or "unknown")
+
+    if result.status != "completed":
+        logging.warning("⚠️ Run %s on thread %s ended %s", result.run_id, thread_id, result.status)
+    return result
@@ -0,0 +1,177 @@
+# modal_api/utils/serialization.py
+#
+# Encoding for records stored in Redis (tape entries, participant records).
+#
+# KAIROSWARM_RECORD_CODEC picks how new records are written:
+#   json          plain JSON text (default, readable by every service)
+#   orjson        the same JSON wire format, encoded/decoded with orjson
+#   msgpack       versioned binary envelope, known keys packed as small ints
+#   msgpack+zstd  as msgpack, with zstd for records whose packed size is large
+#
+# Reads accept every format, so a swarm can hold a mix of old JSON entries and new
+# binary ones. Binary records must be read with get_redis(decode_responses=False).
+# Other services that read these keys expect JSON: only switch to a binary codec once
+# they read through decode_record as well.
+
+import json
+import os
+import uuid
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: binary codecs
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional: compression for long records
+    zstandard = None
+
+# Envelope: 0xFF (never the first byte of UTF-8 JSON), version, format
+MAGIC = 0xFF
+VERSION = 1
+FORMAT_MSGPACK = 1
+FORMAT_MSGPACK_ZSTD = 2
+
+ZSTD_MIN_BYTES = int(os.getenv("KAIROSWARM_ZSTD_MIN_BYTES", "512"))
+
+# Version 1 key table. Append only: changing existing positions needs a new VERSION.
+KEY_TABLE_V1 = (
+    "from", "type", "message", "timestamp",
+    "id", "name", "joined_at", "user_id", "metadata", "agent_id", "thread_id",
+)
+_KEY_CODES = {key: i for i, key in enumerate(KEY_TABLE_V1)}
+
+CODECS = ("json", "orjson", "msgpack", "msgpack+zstd")
+
+
+def default_codec():
+    return os.getenv("KAIROSWARM_RECORD_CODEC", "json")
+
+
+def _pack_keys(value):
+    if isinstance(value, dict):
+        return {_KEY_CODES.get(k, k): _pack_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_pack_keys(v) for v in value]
+    return value
+
+
+def _unpack_keys(value):
+    if isinstance(value, dict):
+        return {
+            (KEY_TABLE_V1[k] if isinstance(k, int) and k < len(KEY_TABLE_V1) else k): _unpack_keys(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_unpack_keys(v) for v in value]
+    return value
+
+
+def encode_record(record, codec=None):
+    """Encodes a dict for storage. Returns str for the JSON codecs, bytes otherwise."""
+    codec = codec or default_codec()
+
+    if codec == "json":
+        return json.dumps(record)
+    if codec == "orjson":
+        if orjson is None:
+            return json.dumps(record)
+        return orjson.dumps(record).decode("utf-8")
+
+    if codec not in ("msgpack", "msgpack+zstd"):
+        raise ValueError(f"Unknown record codec: {codec}")
+    if msgpack is None:
+        raise RuntimeError(f"Record codec '{codec}' needs the msgpack package")
+
+    packed = msgpack.packb(_pack_keys(record), use_bin_type=True)
+    if codec == "msgpack+zstd" and len(packed) >= ZSTD_MIN_BYTES:
+        if zstandard is None:
+            raise RuntimeError("Record codec 'msgpack+zstd' needs the zstandard package")
+        return bytes((MAGIC, VERSION, FORMAT_MSGPACK_ZSTD)) + zstandard.ZstdCompressor().compress(packed)
+    return bytes((MAGIC, VERSION, FORMAT_MSGPACK)) + packed
+
+
+def is_binary_record(raw):
+    return isinstance(raw, (bytes, bytearray)) and len(raw) >= 3 and raw[0] == MAGIC
+
+
+def is_record(raw):
+    """True for anything decode_record can read as a dict (skips e.g. placeholder hash values)."""
+    if is_binary_record(raw):
+        return True
+    if isinstance(raw, (bytes, bytearray)):
+        return raw.lstrip()[:1] == b"{"
+    return isinstance(raw, str) and raw.lstrip()[:1] == "{"
+
+
+def _loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def decode_record(raw):
+    """Decodes a stored record written with any codec (or by older code as plain JSON)."""
+    if not is_binary_record(raw):
+        return _loads(raw)
+
+    version, fmt = raw[1], raw[2]
+    if version != VERSION:
+        raise ValueError(f"Unsupported record version {version}")
+    body = bytes(raw[3:])
+    if fmt == FORMAT_MSGPACK_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Reading zstd records needs the zstandard package")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif fmt != FORMAT_MSGPACK:
+        raise ValueError(f"Unsupported record format {fmt}")
+    if msgpack is None:
+        raise RuntimeError("Reading binary records needs the msgpack package")
+    return _unpack_keys(msgpack.unpackb(body, raw=False, strict_map_key=False))
+
+
+def as_json_text(raw):
+    """A stored record as JSON text: passed through when it already is JSON, converted otherwise."""
+    if is_binary_record(raw):
+        return encode_record(decode_record(raw), "orjson")
+    if isinstance(raw, (bytes, bytearray)):
+        return raw.decode("utf-8")
+    return raw
+
+
+async def reencode_swarm(r, sid, codec=None):
+    """
+    Migration helper: rewrites a swarm's tape and participant records in `codec`.
+    `r` must be a get_redis(decode_responses=False) client. Returns records rewritten.
+    """
+    codec = codec or default_codec()
+    rewritten = 0
+
+    tape_key = f"{sid}:conversation_tape"
+    lock_key = f"{sid}:tape_archive_lock"  # same lock tape.archive_overflow takes before trimming
+    token = str(uuid.uuid4())
+    if not await r.set(lock_key, token, nx=True, ex=60):
+        raise RuntimeError(f"Tape of swarm {sid} is being archived, retry shortly")
+    try:
+        # LSET by index is safe against concurrent RPUSH while no trim can run
+        for i, raw in enumerate(await r.lrange(tape_key, 0, -1)):
+            if is_record(raw):
+                await r.lset(tape_key, i, encode_record(decode_record(raw), codec))
+                rewritten += 1
+    finally:
+        from modal_api.utils.services import release_lock
+        await release_lock(r, lock_key, token)
+
+    participants = await r.hgetall(f"{sid}:participants")
+    for pid, raw in participants.items():
+        if is_record(raw):
+            await r.hset(f"{sid}:participants", pid, encode_record(decode_record(raw), codec))
+            rewritten += 1
+
+    return rewritten
@@ -1,23 +1,189 @@
 # modal_api/utils/secrets.py
+#
+# Client factories. Heavy SDKs (openai, stripe, supabase, asyncpg, kairoswarm_core)
+# are imported on first use so a cold container only pays for what a request needs;
+# pooled clients are cached per event loop and can be pre-built by warm_up().
+import asyncio
+import importlib
 import os
+import time
+import weakref
 from pydantic import BaseModel
 from fastapi import HTTPException
 import logging
-import openai
 import redis.asyncio as redis
-from supabase import Client, create_client
+
+from modal_api.utils.metrics import span
+
+_loop_caches = weakref.WeakKeyDictionary()  # event loop -> {name: client}
+
+
+async def _loop_cached(name, factory):
+    """
+    Returns the client `name` for the running loop, creating it with `await factory()`
+    once. Concurrent first callers share the same creation task; failures are retried.
+    """
+    cache = _loop_caches.setdefault(asyncio.get_running_loop(), {})
+    task = cache.get(name)
+    if task is None:
+        task = cache[name] = asyncio.ensure_future(factory())
+    try:
+        return await asyncio.shield(task)
+    except Exception:
+        if cache.get(name) is task:
+            del cache[name]
+        raise
+
+
+def _loop_cache():
+    try:
+        return _loop_caches.get(asyncio.get_running_loop(), {})
+    except RuntimeError:
+        return {}
+
 
 # --- Redis Factory ---
-def get_redis():
-    url = os.environ["REDIS_URL"]
-    return redis.from_url(url, decode_responses=True)
+class InstrumentedRedis(redis.Redis):
+    """Redis client that records a dependency span per command."""
+
+    async def execute_command(self, *args, **options):
+        with span("redis", str(args[0]).upper() if args else ""):
+            return await super().execute_command(*args, **options)
+
+def get_redis(decode_responses=True):
+    """
+    A client over the shared connection pool for this loop. Closing the client
+    (e.g. `async with get_redis() as r`) returns connections to the pool.
+    Use decode_responses=False for keys that may hold binary records (see serialization.py).
+    """
+    name = "redis_pool" if decode_responses else "redis_pool_bytes"
+    cache = _loop_caches.setdefault(asyncio.get_running_loop(), {})
+    pool = cache.get(name)
+    if pool is None:
+        pool = cache[name] = redis.ConnectionPool.from_url(os.environ["REDIS_URL"], decode_responses=decode_responses)
+    return InstrumentedRedis(connection_pool=pool)
+
+async def release_lock(r, lock_key, token):
+    """
+    Deletes a SET NX lock only if it still holds `token`: after its TTL ran out another
+    worker may have taken it, and that lock must stay.
+    """
+    async with r.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(lock_key)
+            held = await pipe.get(lock_key)
+            if (held.decode() if isinstance(held, bytes) else held) != token:
+                return False
+            pipe.multi()
+            pipe.delete(lock_key)
+            await pipe.execute()
+            return True
+        except redis.WatchError:
+            return False  # changed under us: no longer ours
 
 # --- Supabase Factory ---
-def get_supabase() -> Client:
+def get_supabase():
+    # Not cached: auth calls (sign_in, get_user) store the user's session on the client
+    from supabase import create_client
+
     url = os.environ["SUPABASE_URL"]
     key = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
     return create_client(url, key)
 
+# --- OpenAI Factories ---
+def get_openai():
+    """The `openai` module, for the synchronous module-level client."""
+    import openai
+
+    if not openai.api_key:
+        openai.api_key = os.environ.get("OPENAI_API_KEY")
+    return openai
+
+async def get_async_openai():
+    async def create():
+        from openai import AsyncOpenAI
+        return AsyncOpenAI()
+
+    return await _loop_cached("async_openai", create)
+
+# --- Stripe Factory ---
+def get_stripe():
+    import stripe
+
+    stripe_mode = os.environ.get("STRIPE_MODE", "test")
+    stripe.api_key = os.environ.get("STRIPE_LIVE_KEY" if stripe_mode == "live" else "STRIPE_SECRET_KEY", "")
+    return stripe
+
+# --- Postgres Factory ---
+async def get_pg_pool():
+    async def create():
+        import asyncpg
+        async with span("postgres", "create_pool"):
+            return await asyncpg.create_pool(dsn=os.getenv("POSTGRES_URL"))
+
+    return await _loop_cached("pg_pool", create)
+
+# --- Memory Store Factory ---
+async def get_memory_store():
+    """
+    A freshly initialized MemoryStore per call. Unlike the pools above it is not cached:
+    nothing guarantees kairoswarm_core's store is safe for concurrent use (it may hold a
+    single connection), so warm_up() only pre-imports it.
+    """
+    from kairoswarm_core.memory_core.memory_store import MemoryStore
+
+    store = MemoryStore()
+    async with span("postgres", "memory_store.init"):
+        await store.init()
+    return store
+
+# --- Warm-up ---
+async def warm_up():
+    """
+    Pre-initializes pools and imports heavy SDKs before the container takes traffic.
+    Failures are logged, not raised: a missing dependency should only fail its own routes.
+    """
+    steps = {
+        "redis": lambda: get_redis().ping(),
+        "openai": get_async_openai,
+        "stripe": lambda: asyncio.to_thread(get_stripe),
+        "supabase": lambda: asyncio.to_thread(importlib.import_module, "supabase"),
+    }
+    if os.getenv("POSTGRES_URL"):
+        steps["postgres"] = get_pg_pool
+        steps["memory_store"] = lambda: asyncio.to_thread(
+            importlib.import_module, "kairoswarm_core.memory_core.memory_store"
+        )
+
+    async def run(name, step):
+        start = time.perf_counter()
+        try:
+            await step()
+            logging.info("🔥 Warmed %s in %.0f ms", name, (time.perf_counter() - start) * 1000)
+        except Exception:
+            logging.exception("⚠️ Warm-up of %s failed", name)
+
+    await asyncio.gather(*(run(name, step) for name, step in steps.items()))
+
+async def close_clients():
+    cache = _loop_cache()
+    for name, client in list(cache.items()):
+        try:
+            if name in ("redis_pool", "redis_pool_bytes"):
+                await client.disconnect()
+                continue
+            if isinstance(client, asyncio.Future):
+                if not client.done() or client.cancelled() or client.exception():
+                    continue
+                client = client.result()
+            if hasattr(client, "close"):
+                result = client.close()
+                if asyncio.iscoroutine(result):
+                    await result
+        except Exception:
+            logging.exception("Failed to close %s", name)
+    cache.clear()
+
 # --- Embedding Factory ---
 class EmbeddingRequest(BaseModel):
     text: str
@@ -27,10 +193,12 @@ async def generate_embedding(payload: EmbeddingRequest):
         if not payload.text.strip():
             raise HTTPException(status_code=400, detail="Input text cannot be empty.")
 
-        response = openai.embeddings.create(
-            input=payload.text.strip(),
-            model="text-embedding-3-small"
-        )
+        client = await get_async_openai()
+        async with span("openai", "embeddings.create"):
+            response = await client.embeddings.create(
+                input=payload.text.strip(),
+                model="text-embedding-3-small"
+            )
 
         embedding = response.data[0].embedding
         return {"embedding": embedding}
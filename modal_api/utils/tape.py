@@ -0,0 +1,255 @@
+# modal_api/utils/tape.py
+#
+# Conversation tape with a bounded hot window in Redis and a Postgres archive.
+#
+# `{sid}:conversation_tape` holds only the newest entries. Every entry has a sequence
+# number: `{sid}:tape_offset` is the seq of the first entry still in Redis. When the list
+# grows past TAPE_HOT_WINDOW + TAPE_ARCHIVE_BATCH, the oldest entries are moved to the
+# `tape_archive` table as zlib-compressed chunks and trimmed from Redis. Without
+# POSTGRES_URL nothing is archived: the list keeps the whole tape and grows without bound.
+#
+# Entries are written with the configured record codec (see serialization.py); readers
+# pass a get_redis(decode_responses=False) client. The archive always stores JSON.
+
+import json
+import logging
+import os
+import uuid
+import zlib
+
+from redis.exceptions import WatchError
+
+from modal_api.utils.metrics import background_task, span
+from modal_api.utils.serialization import as_json_text, decode_record, encode_record
+from modal_api.utils.services import get_pg_pool, get_redis, release_lock
+
+TAPE_HOT_WINDOW = int(os.getenv("TAPE_HOT_WINDOW", "200"))
+TAPE_ARCHIVE_BATCH = int(os.getenv("TAPE_ARCHIVE_BATCH", "100"))
+TAPE_PAGE_LIMIT = 500
+
+ARCHIVE_DDL = """
+CREATE TABLE IF NOT EXISTS tape_archive (
+    swarm_id    text        NOT NULL,
+    first_seq   bigint      NOT NULL,
+    last_seq    bigint      NOT NULL,
+    entries     bytea       NOT NULL,
+    archived_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (swarm_id, first_seq)
+)
+"""
+
+_archive_ready = False
+
+
+def tape_key(sid):
+    return f"{sid}:conversation_tape"
+
+
+def offset_key(sid):
+    return f"{sid}:tape_offset"
+
+
+def archive_enabled():
+    return bool(os.getenv("POSTGRES_URL"))
+
+
+async def _ensure_archive(pool):
+    global _archive_ready
+    if not _archive_ready:
+        async with span("postgres", "tape_archive.ddl"):
+            await pool.execute(ARCHIVE_DDL)
+        _archive_ready = True
+
+
+def _compress(raw_entries):
+    return zlib.compress(("[" + ",".join(as_json_text(x) for x in raw_entries) + "]").encode("utf-8"))
+
+
+def _decompress(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+async def append_tape_entry(r, sid, entry):
+    """
+    Appends one entry. Once the hot window is a batch over, the overflow is archived in
+    the background: the append never waits on (or fails with) Postgres.
+    """
+    length = await r.rpush(tape_key(sid), encode_record(entry))
+    if length >= TAPE_HOT_WINDOW + TAPE_ARCHIVE_BATCH and archive_enabled():
+        schedule_archive(get_redis, sid)
+    return length
+
+
+async def archive_overflow(r, sid, keep=None):
+    """
+    Moves everything but the newest `keep` entries to the archive. Writers only RPUSH,
+    so trimming from the left by a count read under the lock is safe. Returns the number
+    of entries archived.
+    """
+    if not archive_enabled():
+        return 0
+    keep = TAPE_HOT_WINDOW if keep is None else keep
+
+    lock_key = f"{sid}:tape_archive_lock"
+    token = str(uuid.uuid4())
+    if not await r.set(lock_key, token, nx=True, ex=30):
+        return 0  # another request is already flushing this swarm
+
+    try:
+        excess = await r.llen(tape_key(sid)) - keep
+        if excess <= 0:
+            return 0
+
+        # Read as bytes: `r` may be a decoding client and entries may be binary
+        async with get_redis(decode_responses=False) as rb:
+            raw = await rb.lrange(tape_key(sid), 0, excess - 1)
+        first_seq = int(await r.get(offset_key(sid)) or 0)
+
+        pool = await get_pg_pool()
+        await _ensure_archive(pool)
+        chunks = [
+            (sid, first_seq + start, first_seq + start + len(chunk) - 1, _compress(chunk))
+            for start in range(0, len(raw), TAPE_ARCHIVE_BATCH)
+            for chunk in [raw[start:start + TAPE_ARCHIVE_BATCH]]
+        ]
+        # A run whose trim failed leaves the offset unchanged, so a retry cuts chunks at the
+        # same first_seq; its last chunk may be longer, so a longer chunk replaces a shorter one
+        async with span("postgres", "tape_archive.insert"):
+            await pool.executemany(
+                "INSERT INTO tape_archive (swarm_id, first_seq, last_seq, entries) VALUES ($1, $2, $3, $4) "
+                "ON CONFLICT (swarm_id, first_seq) DO UPDATE "
+                "SET last_seq = EXCLUDED.last_seq, entries = EXCLUDED.entries, archived_at = now() "
+                "WHERE EXCLUDED.last_seq > tape_archive.last_seq",
+                chunks,
+            )
+
+        # Trim only if nobody archived meanwhile (e.g. after our lock expired): trimming
+        # twice by the same count would drop entries that were never archived
+        async with r.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(offset_key(sid))
+                if int(await pipe.get(offset_key(sid)) or 0) != first_seq:
+                    return 0
+                pipe.multi()
+                pipe.ltrim(tape_key(sid), len(raw), -1)
+                pipe.incrby(offset_key(sid), len(raw))
+                pipe.ttl(tape_key(sid))
+                _, _, ttl = await pipe.execute()
+            except WatchError:
+                return 0
+        if ttl > 0:
+            await r.expire(offset_key(sid), ttl)
+
+        logging.info("🗄️ Archived %d tape entries for swarm %s", len(raw), sid)
+        return len(raw)
+    finally:
+        await release_lock(r, lock_key, token)
+
+
+# sid -> running archive task on this container, so an oversized tape gets one at a time
+_archive_tasks = {}
+
+
+def schedule_archive(r_factory, sid):
+    """
+    Fire-and-forget archive, for writers past the threshold and readers that notice an
+    oversized tape. Callers check archive_enabled() first.
+    """
+    task = _archive_tasks.get(sid)
+    if task is not None and not task.done():
+        return task
+
+    async def run():
+        try:
+            async with r_factory() as r:
+                # Appends that arrived while archiving may have pushed it over again
+                while await archive_overflow(r, sid) and await r.llen(tape_key(sid)) >= TAPE_HOT_WINDOW + TAPE_ARCHIVE_BATCH:
+                    pass
+        except Exception:
+            logging.exception("Tape archival failed for swarm %s", sid)
+        finally:
+            _archive_tasks.pop(sid, None)
+
+    task = _archive_tasks[sid] = background_task(run())
+    return task
+
+
+async def read_hot_window(r, sid, limit=None):
+    """
+    (first_seq, raw entries, total_in_redis) for the newest `limit` entries. Without an
+    archive nothing is ever trimmed, so the default is then the whole tape.
+    """
+    limit = limit or (TAPE_HOT_WINDOW if archive_enabled() else None)
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.get(offset_key(sid))
+        pipe.llen(tape_key(sid))
+        pipe.lrange(tape_key(sid), -limit if limit else 0, -1)
+        offset, length, raw = await pipe.execute()
+    offset = int(offset or 0)
+    return offset + max(0, length - len(raw)), raw, length
+
+
+async def read_tape_page(r, sid, before=None, limit=100):
+    """
+    Entries with seq in [before - limit, before), oldest first, reading Redis for the hot
+    part and the archive for anything older. `before=None` means the end of the tape.
+    Returns (first_seq, entries).
+    """
+    limit = max(1, min(limit, TAPE_PAGE_LIMIT))
+
+    # Optimistic read: if an archive run shifts the offset mid-read, read again
+    for _ in range(3):
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.get(offset_key(sid))
+            pipe.llen(tape_key(sid))
+            offset, length = await pipe.execute()
+        offset = int(offset or 0)
+
+        end = offset + length if before is None else min(before, offset + length)
+        start = max(0, end - limit)
+        if end <= start:
+            return start, []
+
+        raw = []
+        if end > offset:
+            raw = await r.lrange(tape_key(sid), max(start, offset) - offset, end - offset - 1)
+        if int(await r.get(offset_key(sid)) or 0) == offset:
+            break
+
+    cold = []
+    if start < offset and archive_enabled():
+        cold = await read_archive(sid, start, min(end, offset))
+
+    return start, cold + [decode_record(x) for x in raw]
+
+
+async def read_archive(sid, start, end):
+    """Archived entries with seq in [start, end)."""
+    pool = await get_pg_pool()
+    await _ensure_archive(pool)
+    async with span("postgres", "tape_archive.select"):
+        rows = await pool.fetch(
+            "SELECT first_seq, entries FROM tape_archive "
+            "WHERE swarm_id = $1 AND last_seq >= $2 AND first_seq < $3 ORDER BY first_seq",
+            sid, start, end,
+        )
+
+    entries = []
+    next_seq = start  # chunks may overlap (e.g. after a batch size change): skip seqs already read
+    for row in rows:
+        chunk = _decompress(row["entries"])
+        lo = max(next_seq - row["first_seq"], 0)
+        hi = min(end - row["first_seq"], len(chunk))
+        if hi > lo:
+            entries.extend(chunk[lo:hi])
+            next_seq = row["first_seq"] + hi
+    return entries
+
+
+async def clear_tape(r, sid):
+    await r.delete(tape_key(sid), offset_key(sid))
+    if archive_enabled():
+        pool = await get_pg_pool()
+        await _ensure_archive(pool)
+        async with span("postgres", "tape_archive.delete"):
+            await pool.execute("DELETE FROM tape_archive WHERE swarm_id = $1", sid)
@@ -0,0 +1,92 @@
+# modal_api/utils/tape_stream.py
+#
+# Live agent output for a swarm, over Redis pub/sub channel `{sid}:tape_stream`.
+# While an agent's run streams, its text deltas are published as
+#   {"type": "delta", "stream_id": ..., "from": name, "text": "..."}
+# and once the reply is committed to the tape (exactly once, by the writer) as
+#   {"type": "done", "stream_id": ..., "entry": {...}}
+# Clients read it as server-sent events from GET /tape/stream. Pub/sub is fire and
+# forget: a client that connects late catches up from /tape.
+
+import asyncio
+import json
+import os
+import time
+
+from modal_api.utils.metrics import histogram
+
+DELTA_FLUSH_CHARS = int(os.getenv("TAPE_STREAM_FLUSH_CHARS", "32"))
+DELTA_FLUSH_S = float(os.getenv("TAPE_STREAM_FLUSH_MS", "50")) / 1000
+HEARTBEAT_S = 15.0
+
+FIRST_DELTA_LATENCY = histogram(
+    "kairoswarm_agent_first_delta_seconds",
+    "Time from starting a streamed agent run to its first text delta.",
+)
+
+
+def channel(sid):
+    return f"{sid}:tape_stream"
+
+
+class DeltaPublisher:
+    """Coalesces token deltas into PUBLISHes of at least DELTA_FLUSH_CHARS or every DELTA_FLUSH_S."""
+
+    def __init__(self, r, sid, stream_id, name):
+        self.r = r
+        self.sid = sid
+        self.stream_id = stream_id
+        self.name = name
+        self.buffer = []
+        self.buffered = 0
+        self.started = self.last_flush = time.monotonic()
+        self.first_delta_at = None
+
+    async def add(self, text):
+        first = self.first_delta_at is None
+        if first:
+            self.first_delta_at = time.monotonic()
+            FIRST_DELTA_LATENCY.observe(self.first_delta_at - self.started)
+        self.buffer.append(text)
+        self.buffered += len(text)
+        # The first delta goes out at once: it is what the user is waiting for
+        if first or self.buffered >= DELTA_FLUSH_CHARS or time.monotonic() - self.last_flush >= DELTA_FLUSH_S:
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        text, self.buffer, self.buffered = "".join(self.buffer), [], 0
+        self.last_flush = time.monotonic()
+        await self.r.publish(channel(self.sid), json.dumps({
+            "type": "delta", "stream_id": self.stream_id, "from": self.name, "text": text,
+        }))
+
+    async def done(self, entry):
+        await self.flush()
+        await self.r.publish(channel(self.sid), json.dumps({
+            "type": "done", "stream_id": self.stream_id, "entry": entry,
+        }))
+
+
+async def sse_events(r, sid, is_disconnected):
+    """Server-sent events for the swarm's channel, with a heartbeat comment every HEARTBEAT_S."""
+    pubsub = r.pubsub()
+    await pubsub.subscribe(channel(sid))
+    try:
+        yield ": connected\n\n"
+        last_sent = time.monotonic()
+        while not await is_disconnected():
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is not None:
+                data = message["data"]
+                yield f"data: {data.decode() if isinstance(data, bytes) else data}\n\n"
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= HEARTBEAT_S:
+                yield ": heartbeat\n\n"
+                last_sent = time.monotonic()
+            else:
+                await asyncio.sleep(0)
+    finally:
+        await pubsub.unsubscribe(channel(sid))
+        await pubsub.aclose()
@@ -0,0 +1,135 @@
+# modal_api/utils/thread_pool.py
+#
+# Pool of pre-created, empty OpenAI threads, so joining an agent to a swarm doesn't wait
+# on threads.create.
+#
+# Thread ids sit in the Redis list `openai:thread_pool` as "{created_unix}:{thread_id}".
+# acquire_thread() LPOPs one (a miss creates a thread inline) and, when the pool is below
+# THREAD_POOL_LOW, starts a background top-up to THREAD_POOL_TARGET. Only one container
+# refills at a time (SET NX lock, released only by its holder). Threads older than
+# THREAD_POOL_MAX_AGE are skipped, as OpenAI may delete inactive threads. The
+# refill_thread_pool job in app.py also tops it up on a schedule.
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from modal_api.utils.metrics import background_task, counter, gauge, span
+from modal_api.utils.services import get_async_openai, get_redis, release_lock
+
+POOL_KEY = "openai:thread_pool"
+REFILL_LOCK_KEY = "openai:thread_pool:refill_lock"
+
+POOL_TARGET = int(os.getenv("THREAD_POOL_TARGET", "32"))
+POOL_LOW = int(os.getenv("THREAD_POOL_LOW", "8"))
+CREATE_CONCURRENCY = int(os.getenv("THREAD_POOL_CREATE_CONCURRENCY", "8"))
+MAX_AGE_S = int(os.getenv("THREAD_POOL_MAX_AGE", str(7 * 86400)))
+
+THREAD_POOL_DEPTH = gauge(
+    "kairoswarm_thread_pool_depth",
+    "Pre-created OpenAI threads waiting in the pool (as last seen by this container).",
+)
+THREAD_POOL_ACQUIRES = counter(
+    "kairoswarm_thread_pool_acquires_total",
+    "Thread acquisitions by outcome (hit, miss, stale).",
+    ("outcome",),
+)
+THREAD_POOL_CREATED = counter(
+    "kairoswarm_thread_pool_created_total",
+    "Threads created to top up the pool.",
+)
+
+# Keeps fire-and-forget refills referenced until they finish
+_refills = set()
+
+
+async def create_thread():
+    client = await get_async_openai()
+    async with span("openai", "threads.create"):
+        thread = await client.beta.threads.create()
+    return thread.id
+
+
+async def refill(r, target=None):
+    """Tops the pool up to `target` threads unless another refill holds the lock. Returns how many were added."""
+    target = target or POOL_TARGET
+    token = str(uuid.uuid4())
+    if not await r.set(REFILL_LOCK_KEY, token, nx=True, ex=120):
+        return 0
+    try:
+        missing = target - await r.llen(POOL_KEY)
+        if missing <= 0:
+            return 0
+
+        limit = asyncio.Semaphore(CREATE_CONCURRENCY)
+
+        async def create_one():
+            async with limit:
+                return await create_thread()
+
+        results = await asyncio.gather(*(create_one() for _ in range(missing)), return_exceptions=True)
+        thread_ids = [result for result in results if isinstance(result, str)]
+        failures = len(results) - len(thread_ids)
+        if failures:
+            logging.warning("⚠️ %d of %d pooled thread creations failed", failures, missing)
+        if thread_ids:
+            now = int(time.time())
+            depth = await r.rpush(POOL_KEY, *(f"{now}:{thread_id}" for thread_id in thread_ids))
+            THREAD_POOL_DEPTH.set(depth)
+            THREAD_POOL_CREATED.inc(len(thread_ids))
+        return len(thread_ids)
+    finally:
+        await release_lock(r, REFILL_LOCK_KEY, token)
+
+
+def schedule_refill():
+    async def run():
+        try:
+            async with get_redis() as r:
+                await refill(r)
+        except Exception:
+            logging.exception("Thread pool refill failed")
+
+    task = background_task(run())
+    _refills.add(task)
+    task.add_done_callback(_refills.discard)
+    return task
+
+
+async def acquire_thread(r):
+    """An empty thread id: from the pool if possible, else freshly created. `r` must decode responses."""
+    thread_id = None
+    while thread_id is None:
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.lpop(POOL_KEY)
+            pipe.llen(POOL_KEY)
+            entry, depth = await pipe.execute()
+        THREAD_POOL_DEPTH.set(depth)
+        if entry is None:
+            break
+        created, _, candidate = entry.partition(":")
+        if time.time() - int(created) > MAX_AGE_S:
+            THREAD_POOL_ACQUIRES.inc(outcome="stale")
+            continue
+        thread_id = candidate
+
+    if depth < POOL_LOW and not _refills:
+        schedule_refill()
+
+    if thread_id is not None:
+        THREAD_POOL_ACQUIRES.inc(outcome="hit")
+        return thread_id
+    THREAD_POOL_ACQUIRES.inc(outcome="miss")
+    return await create_thread()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        async with get_redis() as r:
+            print(f"Added {await refill(r)} threads to {POOL_KEY}")
+
+    asyncio.run(main())